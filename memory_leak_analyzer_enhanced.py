@@ -200,7 +200,7 @@ def main():
             # Perform advanced analysis if requested
             if args.impact_analysis:
                 if ImpactAnalyzer:
-                    impact_analyzer = ImpactAnalyzer()
+                    impact_analyzer = ImpactAnalyzer(collect_reasoning=False)
                     print("\n" + impact_analyzer.generate_priority_report(leak_db))
                     
                     recommendations = impact_analyzer.get_recommendations(leak_db)
@@ -46,6 +46,8 @@ class MemoryTester:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.active_sessions: Dict[str, Dict] = {}
+        # Guards active_sessions so device runs on other threads can update it safely
+        self._sessions_lock = threading.RLock()
         
     def discover_devices_and_containers(self, config_file: Path) -> Dict[str, Any]:
         """Discover all containers and processes on configured devices"""
@@ -67,7 +69,9 @@ class MemoryTester:
                     key_file=device_config['connection'].get('private_key_file', ''),
                     use_diag_shell=device_config['connection'].get('use_diag_shell', True),
                     use_sudo_docker=device_config['connection'].get('use_sudo_docker', True),
-                    diag_command=device_config['connection'].get('diag_command', 'diag shell host')
+                    diag_command=device_config['connection'].get('diag_command', 'diag shell host'),
+                    use_persistent_shell=device_config['connection'].get('use_persistent_shell', False),
+                    use_control_master=device_config['connection'].get('use_control_master', False)
                 )
                 
                 try:
@@ -163,15 +167,18 @@ class MemoryTester:
             key_file=device_config['connection'].get('private_key_file', ''),
             use_diag_shell=device_config['connection'].get('use_diag_shell', True),
             use_sudo_docker=device_config['connection'].get('use_sudo_docker', True),
-            diag_command=device_config['connection'].get('diag_command', 'diag shell host')
+            diag_command=device_config['connection'].get('diag_command', 'diag shell host'),
+            use_persistent_shell=device_config['connection'].get('use_persistent_shell', False),
+            use_control_master=device_config['connection'].get('use_control_master', False)
         )
         
         session_id = f"{device_name}_{int(time.time())}"
-        self.active_sessions[session_id] = {
-            'device_name': device_name,
-            'start_time': datetime.now(),
-            'status': 'initializing'
-        }
+        with self._sessions_lock:
+            self.active_sessions[session_id] = {
+                'device_name': device_name,
+                'start_time': datetime.now(),
+                'status': 'initializing'
+            }
         
         try:
             self.logger.info(f"🔗 Connecting to device: {device_name}")
@@ -179,7 +186,7 @@ class MemoryTester:
             with DeviceConnector(device_cfg) as device:
                 docker_manager = DockerManager(device)
                 
-                self.active_sessions[session_id]['status'] = 'connected'
+                self._update_session(session_id, status='connected')
                 
                 # Process each test scenario
                 test_scenarios = device_config.get('test_scenarios', [])
@@ -196,16 +203,14 @@ class MemoryTester:
                         self.logger.error(f"Scenario '{scenario['name']}' failed")
                         return False
                 
-                self.active_sessions[session_id]['status'] = 'completed'
-                self.active_sessions[session_id]['end_time'] = datetime.now()
+                self._update_session(session_id, status='completed', end_time=datetime.now())
                 
                 self.logger.info(f"✅ Device {device_name} testing completed successfully")
                 return True
                 
         except Exception as e:
             self.logger.error(f"❌ Device {device_name} testing failed: {e}")
-            self.active_sessions[session_id]['status'] = 'failed'
-            self.active_sessions[session_id]['error'] = str(e)
+            self._update_session(session_id, status='failed', error=str(e))
             return False
     
     def _run_scenario(self, device: DeviceConnector, docker_manager: DockerManager, 
@@ -335,11 +340,9 @@ class MemoryTester:
             # Step 5: Collect results
             self.logger.info("📥 Collecting Valgrind results...")
             
-            # Stop Valgrind
+            # Stop Valgrind and wait for it to finish writing its output
             if valgrind_pid:
-                kill_cmd = f"docker exec {container_id} kill -TERM {valgrind_pid}"
-                device.execute_command(kill_cmd)
-                time.sleep(10)  # Wait for output
+                docker_manager.stop_valgrind_in_container(container_id, valgrind_pid, timeout=10)
             
             # Download results
             output_dir = Path(scenario.get('output', {}).get('output_dir', 'results'))
@@ -448,12 +451,21 @@ class MemoryTester:
         
         return all_success
     
+    def _update_session(self, session_id: str, **fields):
+        """Update fields of a testing session under the sessions lock"""
+        with self._sessions_lock:
+            self.active_sessions[session_id].update(fields)
+    
     def get_session_status(self, session_id: str = None) -> Dict:
-        """Get status of testing sessions"""
-        if session_id:
-            return self.active_sessions.get(session_id, {})
-        else:
-            return self.active_sessions
+        """Get status of testing sessions
+        
+        Returns a snapshot, so callers can iterate it while sessions keep updating.
+        """
+        with self._sessions_lock:
+            if session_id:
+                return dict(self.active_sessions.get(session_id, {}))
+            else:
+                return {sid: dict(session) for sid, session in self.active_sessions.items()}
     
     def generate_consolidated_report(self, output_dir: Path) -> bool:
         """Generate consolidated report from all results"""
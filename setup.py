@@ -50,6 +50,8 @@ setup(
     extras_require={
         "gui": ["tkinter-tooltip"],
         "plotting": ["matplotlib", "plotly"],
+        "speedups": ["orjson"],
+        "async": ["asyncssh"],
         "dev": ["pytest", "pytest-cov", "black", "flake8"],
         "docs": ["sphinx", "sphinx-rtd-theme"],
     },
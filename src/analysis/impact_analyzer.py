@@ -3,12 +3,14 @@ Impact Analysis for Memory Leak Analyzer
 Scores and prioritizes memory leaks based on various factors
 """
 
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
+from bisect import bisect_right
+from collections import Counter
 from dataclasses import dataclass
 from enum import Enum
 import re
 
-from ..models.leak_data import MemoryLeak, LeakType, LeakDatabase
+from ..models.leak_data import MemoryLeak, LeakType, LeakDatabase, StackFrame
 
 class ImpactCategory(Enum):
     CRITICAL = "critical"
@@ -17,6 +19,16 @@ class ImpactCategory(Enum):
     LOW = "low"
     NEGLIGIBLE = "negligible"
 
+# Lower bounds of each category above NEGLIGIBLE, in ascending order
+_CATEGORY_THRESHOLDS = (0.3, 0.5, 0.7, 0.9)
+_CATEGORIES_BY_RANK = (
+    ImpactCategory.NEGLIGIBLE,
+    ImpactCategory.LOW,
+    ImpactCategory.MEDIUM,
+    ImpactCategory.HIGH,
+    ImpactCategory.CRITICAL,
+)
+
 @dataclass
 class ImpactScore:
     """Impact score for a memory leak"""
@@ -32,7 +44,11 @@ class ImpactScore:
 class ImpactAnalyzer:
     """Analyzes and scores memory leaks by impact"""
     
-    def __init__(self):
+    def __init__(self, collect_reasoning: bool = True):
+        # When False, bulk scoring skips building the human-readable reasoning
+        # strings; only the top issues surfaced in reports get them
+        self.collect_reasoning = collect_reasoning
+        
         # Critical function patterns that indicate high impact
         self.critical_patterns = [
             r'main\b',
@@ -68,19 +84,31 @@ class ImpactAnalyzer:
             r'demo\w*',
             r'sample\w*'
         ]
+        
+        # Each pattern list is compiled once into a single case-insensitive alternation
+        self._critical_re = re.compile("|".join(self.critical_patterns), re.IGNORECASE)
+        self._critical_files_re = re.compile("|".join(self.critical_files), re.IGNORECASE)
+        self._low_impact_re = re.compile("|".join(self.low_impact_patterns), re.IGNORECASE)
     
-    def analyze_leak_impact(self, leak: MemoryLeak, frequency_data: Dict[str, int] = None) -> ImpactScore:
+    def analyze_leak_impact(self, leak: MemoryLeak, frequency_data: Dict[str, int] = None,
+                            collect_reasoning: Optional[bool] = None) -> ImpactScore:
         """Analyze the impact of a single memory leak"""
-        reasoning = []
+        if collect_reasoning is None:
+            collect_reasoning = self.collect_reasoning
+        reasoning = [] if collect_reasoning else None
+        
+        # Resolve per-leak derived values once and thread them through the scorers
+        severity = leak.get_severity()
+        primary_location = leak.primary_location
         
         # 1. Severity Score (based on leak type)
-        severity_score = self._calculate_severity_score(leak, reasoning)
+        severity_score = self._calculate_severity_score(severity, reasoning)
         
         # 2. Size Score (based on memory amount)
         size_score = self._calculate_size_score(leak, reasoning)
         
         # 3. Frequency Score (how often this pattern occurs)
-        frequency_score = self._calculate_frequency_score(leak, frequency_data, reasoning)
+        frequency_score = self._calculate_frequency_score(primary_location, frequency_data, reasoning)
         
         # 4. Location Score (criticality of code location)
         location_score = self._calculate_location_score(leak, reasoning)
@@ -116,132 +144,139 @@ class ImpactAnalyzer:
             frequency_score=frequency_score,
             location_score=location_score,
             type_score=type_score,
-            reasoning=reasoning
+            reasoning=reasoning if reasoning is not None else []
         )
     
-    def _calculate_severity_score(self, leak: MemoryLeak, reasoning: List[str]) -> float:
+    def _calculate_severity_score(self, severity: str, reasoning: Optional[List[str]]) -> float:
         """Calculate score based on leak severity"""
-        severity = leak.get_severity()
-        
         if severity == "HIGH":
-            reasoning.append("High severity leak (definitely lost or buffer overflow)")
+            if reasoning is not None:
+                reasoning.append("High severity leak (definitely lost or buffer overflow)")
             return 1.0
         elif severity == "MEDIUM":
-            reasoning.append("Medium severity leak (possibly lost or stack overflow)")
+            if reasoning is not None:
+                reasoning.append("Medium severity leak (possibly lost or stack overflow)")
             return 0.6
         else:
-            reasoning.append("Low severity leak (still reachable or indirect)")
+            if reasoning is not None:
+                reasoning.append("Low severity leak (still reachable or indirect)")
             return 0.2
     
-    def _calculate_size_score(self, leak: MemoryLeak, reasoning: List[str]) -> float:
+    def _calculate_size_score(self, leak: MemoryLeak, reasoning: Optional[List[str]]) -> float:
         """Calculate score based on leak size"""
         size = leak.size
         
         if size >= 10000:  # 10KB+
-            reasoning.append(f"Very large leak ({size:,} bytes)")
+            if reasoning is not None:
+                reasoning.append(f"Very large leak ({size:,} bytes)")
             return 1.0
         elif size >= 1000:  # 1KB+
-            reasoning.append(f"Large leak ({size:,} bytes)")
+            if reasoning is not None:
+                reasoning.append(f"Large leak ({size:,} bytes)")
             return 0.8
         elif size >= 100:  # 100B+
-            reasoning.append(f"Medium leak ({size:,} bytes)")
+            if reasoning is not None:
+                reasoning.append(f"Medium leak ({size:,} bytes)")
             return 0.5
         elif size >= 10:   # 10B+
-            reasoning.append(f"Small leak ({size:,} bytes)")
+            if reasoning is not None:
+                reasoning.append(f"Small leak ({size:,} bytes)")
             return 0.3
         else:
-            reasoning.append(f"Very small leak ({size:,} bytes)")
+            if reasoning is not None:
+                reasoning.append(f"Very small leak ({size:,} bytes)")
             return 0.1
     
-    def _calculate_frequency_score(self, leak: MemoryLeak, frequency_data: Dict[str, int], reasoning: List[str]) -> float:
+    def _calculate_frequency_score(self, primary_location: str, frequency_data: Dict[str, int], reasoning: Optional[List[str]]) -> float:
         """Calculate score based on how frequently this pattern occurs"""
         if not frequency_data:
             return 0.5  # Default score when no frequency data
         
-        pattern = leak.primary_location
-        frequency = frequency_data.get(pattern, 1)
+        frequency = frequency_data.get(primary_location, 1)
         
         if frequency >= 50:
-            reasoning.append(f"Very frequent pattern ({frequency} occurrences)")
+            if reasoning is not None:
+                reasoning.append(f"Very frequent pattern ({frequency} occurrences)")
             return 1.0
         elif frequency >= 10:
-            reasoning.append(f"Frequent pattern ({frequency} occurrences)")
+            if reasoning is not None:
+                reasoning.append(f"Frequent pattern ({frequency} occurrences)")
             return 0.8
         elif frequency >= 5:
-            reasoning.append(f"Moderate frequency ({frequency} occurrences)")
+            if reasoning is not None:
+                reasoning.append(f"Moderate frequency ({frequency} occurrences)")
             return 0.6
         else:
-            reasoning.append(f"Infrequent pattern ({frequency} occurrences)")
+            if reasoning is not None:
+                reasoning.append(f"Infrequent pattern ({frequency} occurrences)")
             return 0.3
     
-    def _calculate_location_score(self, leak: MemoryLeak, reasoning: List[str]) -> float:
+    def _calculate_location_score(self, leak: MemoryLeak, reasoning: Optional[List[str]]) -> float:
         """Calculate score based on code location criticality"""
-        location_text = leak.primary_location.lower()
-        
         # Check stack trace for critical patterns
         for frame in leak.stack_trace:
-            frame_text = f"{frame.function} {frame.file or ''}".lower()
-            
             # Check for critical patterns
-            for pattern in self.critical_patterns:
-                if re.search(pattern, frame_text):
+            if self._matches(self._critical_re, frame):
+                if reasoning is not None:
                     reasoning.append(f"Critical function: {frame.function}")
-                    return 1.0
+                return 1.0
             
             # Check for critical files
-            if frame.file:
-                for pattern in self.critical_files:
-                    if re.search(pattern, frame.file.lower()):
-                        reasoning.append(f"Critical file: {frame.file}")
-                        return 0.9
+            if frame.file and self._critical_files_re.search(frame.file):
+                if reasoning is not None:
+                    reasoning.append(f"Critical file: {frame.file}")
+                return 0.9
             
             # Check for low-impact patterns
-            for pattern in self.low_impact_patterns:
-                if re.search(pattern, frame_text):
+            if self._matches(self._low_impact_re, frame):
+                if reasoning is not None:
                     reasoning.append(f"Low-impact location: {frame.function}")
-                    return 0.2
+                return 0.2
         
         # Default score for application code
-        reasoning.append("Standard application code")
+        if reasoning is not None:
+            reasoning.append("Standard application code")
         return 0.6
     
-    def _calculate_type_score(self, leak: MemoryLeak, reasoning: List[str]) -> float:
+    @staticmethod
+    def _matches(pattern: re.Pattern, frame: StackFrame) -> bool:
+        """Check a frame's function and file separately rather than their concatenation"""
+        return bool(pattern.search(frame.function) or (frame.file and pattern.search(frame.file)))
+    
+    def _calculate_type_score(self, leak: MemoryLeak, reasoning: Optional[List[str]]) -> float:
         """Calculate score based on leak type inherent risk"""
         leak_type = leak.leak_type
         
         if leak_type in [LeakType.HEAP_BUFFER_OVERFLOW, LeakType.USE_AFTER_FREE, LeakType.DOUBLE_FREE]:
-            reasoning.append("Critical memory safety issue")
+            if reasoning is not None:
+                reasoning.append("Critical memory safety issue")
             return 1.0
         elif leak_type == LeakType.DEFINITELY_LOST:
-            reasoning.append("Definite memory leak")
+            if reasoning is not None:
+                reasoning.append("Definite memory leak")
             return 0.8
         elif leak_type in [LeakType.STACK_BUFFER_OVERFLOW, LeakType.GLOBAL_BUFFER_OVERFLOW]:
-            reasoning.append("Buffer overflow vulnerability")
+            if reasoning is not None:
+                reasoning.append("Buffer overflow vulnerability")
             return 0.9
         elif leak_type == LeakType.POSSIBLY_LOST:
-            reasoning.append("Possible memory leak")
+            if reasoning is not None:
+                reasoning.append("Possible memory leak")
             return 0.5
         elif leak_type == LeakType.INDIRECTLY_LOST:
-            reasoning.append("Indirect memory leak")
+            if reasoning is not None:
+                reasoning.append("Indirect memory leak")
             return 0.4
         elif leak_type == LeakType.STILL_REACHABLE:
-            reasoning.append("Still reachable memory")
+            if reasoning is not None:
+                reasoning.append("Still reachable memory")
             return 0.2
         else:
             return 0.5
     
     def _score_to_category(self, score: float) -> ImpactCategory:
         """Convert numeric score to impact category"""
-        if score >= 0.9:
-            return ImpactCategory.CRITICAL
-        elif score >= 0.7:
-            return ImpactCategory.HIGH
-        elif score >= 0.5:
-            return ImpactCategory.MEDIUM
-        elif score >= 0.3:
-            return ImpactCategory.LOW
-        else:
-            return ImpactCategory.NEGLIGIBLE
+        return _CATEGORIES_BY_RANK[bisect_right(_CATEGORY_THRESHOLDS, score)]
     
     def analyze_database_impact(self, leak_db: LeakDatabase) -> Dict[str, Any]:
         """Analyze impact for entire leak database"""
@@ -251,10 +286,7 @@ class ImpactAnalyzer:
             return {"status": "no_data"}
         
         # Calculate frequency data
-        frequency_data = {}
-        for leak in leaks:
-            pattern = leak.primary_location
-            frequency_data[pattern] = frequency_data.get(pattern, 0) + 1
+        frequency_data = Counter(leak.primary_location for leak in leaks)
         
         # Analyze each leak
         scored_leaks = []
@@ -265,11 +297,13 @@ class ImpactAnalyzer:
         # Sort by impact score (highest first)
         scored_leaks.sort(key=lambda x: x[1].total_score, reverse=True)
         
+        # Reasoning is only rendered for the top issues, so fill it in for those alone
+        if not self.collect_reasoning:
+            for i, (leak, _) in enumerate(scored_leaks[:10]):
+                scored_leaks[i] = (leak, self.analyze_leak_impact(leak, frequency_data, collect_reasoning=True))
+        
         # Calculate summary statistics
-        category_counts = {}
-        for _, impact in scored_leaks:
-            cat = impact.category.value
-            category_counts[cat] = category_counts.get(cat, 0) + 1
+        category_counts = Counter(impact.category.value for _, impact in scored_leaks)
         
         # Get top issues
         top_issues = scored_leaks[:10]
@@ -349,16 +383,17 @@ class ImpactAnalyzer:
         # Pattern analysis
         top_issues = analysis['top_issues'][:3]
         if top_issues:
-            file_patterns = {}
-            for leak, impact in top_issues:
-                for frame in leak.stack_trace:
-                    if frame.file:
-                        file_patterns[frame.file] = file_patterns.get(frame.file, 0) + 1
+            file_patterns = Counter(
+                frame.file
+                for leak, _ in top_issues
+                for frame in leak.stack_trace
+                if frame.file
+            )
             
             if file_patterns:
-                most_problematic = max(file_patterns, key=file_patterns.get)
+                most_problematic, occurrences = file_patterns.most_common(1)[0]
                 recommendations.append(
-                    f"📁 Focus on {most_problematic} - appears in {file_patterns[most_problematic]} "
+                    f"📁 Focus on {most_problematic} - appears in {occurrences} "
                     "high-impact leaks."
                 )
         
@@ -3,14 +3,41 @@ Configuration Manager for Memory Leak Analyzer
 Supports user preferences, custom cleanup patterns, and analysis settings
 """
 
-import json
-import yaml
 from pathlib import Path
+import pickle
 from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
+from functools import lru_cache
 import os
+import sys
 
-@dataclass
+# yaml and json are imported on first use so that importing ConfigManager
+# stays cheap for callers that never touch the config files
+
+def _yaml_load(stream) -> Any:
+    """Safe-load YAML, preferring the libyaml-backed C loader when available"""
+    import yaml
+    return yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+def _yaml_dump(data: Any, stream, **kwargs):
+    """Safe-dump YAML, preferring the libyaml-backed C dumper when available"""
+    import yaml
+    yaml.dump(data, stream, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper), **kwargs)
+
+@lru_cache(maxsize=None)
+def _json_codec():
+    """Return (loads, dumps) for custom patterns, using orjson when it is installed"""
+    try:
+        import orjson
+    except ImportError:
+        import json
+        return json.loads, lambda obj: json.dumps(obj, indent=2).encode('utf-8')
+    return orjson.loads, lambda obj: orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+# Slotted dataclasses need Python 3.10+; older interpreters keep the plain form
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_OPTIONS)
 class CleanupConfig:
     """Configuration for cleanup operations"""
     remove_system_libs: bool = True
@@ -24,7 +51,7 @@ class CleanupConfig:
         if self.custom_exclude_patterns is None:
             self.custom_exclude_patterns = []
 
-@dataclass 
+@dataclass(**_DATACLASS_OPTIONS)
 class FilterConfig:
     """Configuration for filtering operations"""
     default_severity_filter: str = "All"
@@ -32,7 +59,7 @@ class FilterConfig:
     auto_filter_system_libs: bool = False
     max_results_display: int = 1000
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ReportConfig:
     """Configuration for report generation"""
     default_format: str = "html"
@@ -41,7 +68,7 @@ class ReportConfig:
     group_similar_by_default: bool = False
     auto_open_reports: bool = False
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class AnalysisConfig:
     """Configuration for analysis features"""
     enable_trend_analysis: bool = True
@@ -49,7 +76,7 @@ class AnalysisConfig:
     auto_categorize_leaks: bool = True
     enable_impact_scoring: bool = True
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class AppConfig:
     """Main application configuration"""
     cleanup: CleanupConfig
@@ -62,6 +89,13 @@ class AppConfig:
         if self.custom_parsers is None:
             self.custom_parsers = []
 
+# Field names of every config dataclass; part of the parse cache key so a pickle
+# written before a field was added or renamed is never loaded
+_CONFIG_SCHEMA = tuple(
+    (cls.__name__, tuple(f.name for f in fields(cls)))
+    for cls in (CleanupConfig, FilterConfig, ReportConfig, AnalysisConfig, AppConfig)
+)
+
 class ConfigManager:
     """Manages application configuration with multiple sources"""
     
@@ -76,6 +110,8 @@ class ConfigManager:
         self.custom_patterns_file = self.config_dir / "custom_patterns.json"
         self.user_presets_file = self.config_dir / "presets.yaml"
         
+        # Hash of the last config state written to / read from disk
+        self._last_saved_hash: Optional[int] = None
         self._config = self._load_config()
     
     def _get_default_config(self) -> AppConfig:
@@ -90,9 +126,15 @@ class ConfigManager:
     def _load_config(self) -> AppConfig:
         """Load configuration from file or create default"""
         if self.config_file.exists():
+            cache_key = self._parse_cache_key(self.config_file)
+            cached = self._read_parse_cache(self.config_file, cache_key)
+            if cached is not None:
+                self._last_saved_hash = self._config_hash(cached)
+                return cached
+            
             try:
                 with open(self.config_file, 'r') as f:
-                    data = yaml.safe_load(f)
+                    data = _yaml_load(f)
                 
                 # Parse nested dataclasses
                 cleanup_data = data.get('cleanup', {})
@@ -100,26 +142,101 @@ class ConfigManager:
                 reporting_data = data.get('reporting', {})
                 analysis_data = data.get('analysis', {})
                 
-                return AppConfig(
+                config = AppConfig(
                     cleanup=CleanupConfig(**cleanup_data),
                     filtering=FilterConfig(**filtering_data),
                     reporting=ReportConfig(**reporting_data),
                     analysis=AnalysisConfig(**analysis_data),
                     custom_parsers=data.get('custom_parsers', [])
                 )
+                self._write_parse_cache(self.config_file, cache_key, config)
+                self._last_saved_hash = self._config_hash(config)
+                return config
             except Exception as e:
                 print(f"Warning: Could not load config file: {e}")
                 return self._get_default_config()
         else:
-            config = self._get_default_config()
+            self._config = self._get_default_config()
             self.save_config()
-            return config
+            return self._config
+    
+    @staticmethod
+    def _parse_cache_path(source: Path) -> Path:
+        """Get the pickle cache path that sits next to a YAML source file"""
+        return source.with_name(source.name + ".cache.pkl")
+    
+    @staticmethod
+    def _parse_cache_key(source: Path) -> Optional[tuple]:
+        """Identify the exact version of source a cached parse belongs to.
+        
+        Any change to the file's mtime or size (including an older mtime restored
+        by git checkout or cp -p) or to the config dataclass fields gives a new key.
+        """
+        try:
+            stat = source.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, _CONFIG_SCHEMA)
+    
+    def _read_parse_cache(self, source: Path, key: Optional[tuple]) -> Optional[Any]:
+        """Return the cached parse of source if it was stored under exactly this key"""
+        if key is None:
+            return None
+        try:
+            cached_key, value = pickle.loads(self._parse_cache_path(source).read_bytes())
+        except Exception:
+            # Missing, truncated or unpicklable cache: re-parse
+            return None
+        return value if cached_key == key else None
+    
+    def _write_parse_cache(self, source: Path, key: Optional[tuple], value: Any):
+        """Store the parsed value of source under key; failures only cost a re-parse next time"""
+        cache_path = self._parse_cache_path(source)
+        try:
+            if key is None:
+                raise OSError(f"cannot stat {source}")
+            cache_path.write_bytes(pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            # Never leave an entry behind that could outlive the file it describes
+            try:
+                cache_path.unlink()
+            except OSError:
+                pass
+    
+    @staticmethod
+    def _config_to_dict(config: AppConfig) -> Dict[str, Any]:
+        """Build the serializable form of the config without asdict's recursive deep copy.
+        
+        The section dataclasses only hold primitives and lists of strings, so a
+        shallow field mapping is already in the right shape for yaml.dump.
+        """
+        def section(obj) -> Dict[str, Any]:
+            return {f.name: getattr(obj, f.name) for f in fields(obj)}
+        
+        return {
+            'cleanup': section(config.cleanup),
+            'filtering': section(config.filtering),
+            'reporting': section(config.reporting),
+            'analysis': section(config.analysis),
+            'custom_parsers': config.custom_parsers
+        }
+    
+    def _config_hash(self, config: AppConfig) -> int:
+        """Hash the serialized form of a config to detect unchanged saves"""
+        return hash(repr(self._config_to_dict(config)))
     
     def save_config(self):
-        """Save current configuration to file"""
+        """Save current configuration to file, skipping the write if nothing changed"""
+        config_hash = self._config_hash(self._config)
+        if config_hash == self._last_saved_hash:
+            return
+        
         try:
             with open(self.config_file, 'w') as f:
-                yaml.dump(asdict(self._config), f, default_flow_style=False)
+                _yaml_dump(self._config_to_dict(self._config), f, default_flow_style=False)
+            self._last_saved_hash = config_hash
+            # Keep the parse cache in step with the file just written
+            self._write_parse_cache(self.config_file, self._parse_cache_key(self.config_file), self._config)
         except Exception as e:
             print(f"Warning: Could not save config file: {e}")
     
@@ -138,8 +255,8 @@ class ConfigManager:
         """Load custom exclude patterns"""
         if self.custom_patterns_file.exists():
             try:
-                with open(self.custom_patterns_file, 'r') as f:
-                    return json.load(f)
+                loads, _ = _json_codec()
+                return loads(self.custom_patterns_file.read_bytes())
             except Exception:
                 pass
         
@@ -152,17 +269,24 @@ class ConfigManager:
     def save_custom_patterns(self, patterns: Dict[str, List[str]]):
         """Save custom exclude patterns"""
         try:
-            with open(self.custom_patterns_file, 'w') as f:
-                json.dump(patterns, f, indent=2)
+            _, dumps = _json_codec()
+            self.custom_patterns_file.write_bytes(dumps(patterns))
         except Exception as e:
             print(f"Warning: Could not save custom patterns: {e}")
     
     def get_presets(self) -> Dict[str, Dict[str, Any]]:
         """Get user-defined presets"""
         if self.user_presets_file.exists():
+            cache_key = self._parse_cache_key(self.user_presets_file)
+            cached = self._read_parse_cache(self.user_presets_file, cache_key)
+            if cached is not None:
+                return cached
+            
             try:
                 with open(self.user_presets_file, 'r') as f:
-                    return yaml.safe_load(f) or {}
+                    presets = _yaml_load(f) or {}
+                self._write_parse_cache(self.user_presets_file, cache_key, presets)
+                return presets
             except Exception:
                 pass
         
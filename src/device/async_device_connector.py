@@ -0,0 +1,138 @@
+"""
+Async Device Connector for Memory Leak Analyzer
+asyncssh-based counterpart of DeviceConnector for running commands concurrently
+"""
+
+import asyncio
+import logging
+from typing import List, Sequence, Tuple
+
+from .device_connector import DeviceConfig, _prepare_command_cached
+
+class AsyncDeviceConnector:
+    """Runs commands on a device over one asyncssh connection.
+    
+    asyncssh multiplexes every command on its own channel over the same
+    transport, so a batch awaited with asyncio.gather (run_many) costs about
+    one round-trip instead of one per command. Connectors for several
+    devices can likewise be driven concurrently from a single event loop.
+    Requires the optional 'asyncssh' package (pip install .[async]).
+    """
+    
+    def __init__(self, config: DeviceConfig):
+        self.config = config
+        self.conn = None
+        self.logger = logging.getLogger(__name__)
+        self.connected = False
+        self.in_diag_shell = False
+        self.docker_accessible = False
+    
+    async def connect(self) -> bool:
+        """Establish connection to the device"""
+        if self.config.connection_type.lower() != "ssh":
+            raise NotImplementedError("Telnet connection not implemented yet")
+        
+        try:
+            import asyncssh
+        except ImportError:
+            self.logger.error("asyncssh is not installed; install it to use AsyncDeviceConnector")
+            return False
+        
+        try:
+            # Host keys are not verified, matching DeviceConnector's AutoAddPolicy
+            connect_params = {
+                'port': self.config.port,
+                'username': self.config.username,
+                'known_hosts': None,
+                'connect_timeout': self.config.timeout,
+                'keepalive_interval': self.config.keepalive_interval,
+            }
+            if self.config.key_file:
+                connect_params['client_keys'] = [self.config.key_file]
+            else:
+                connect_params['password'] = self.config.password
+            
+            self.conn = await asyncssh.connect(self.config.hostname, **connect_params)
+            self.connected = True
+            self.logger.info(f"Connected to device {self.config.hostname}")
+            
+            if self.config.use_diag_shell and not await self._test_docker_access():
+                await self._setup_diag_shell()
+            
+            return True
+        
+        except Exception as e:
+            self.logger.error(f"SSH connection failed: {e}")
+            return False
+    
+    async def _test_docker_access(self) -> bool:
+        """Test if Docker is accessible (with or without sudo)"""
+        command = "docker --version"
+        if self.config.use_sudo_docker:
+            command = "docker --version || sudo docker --version"
+        
+        exit_code, stdout, _ = await self._execute_raw_command(command, timeout=10)
+        self.docker_accessible = exit_code == 0 and "Docker version" in stdout
+        return self.docker_accessible
+    
+    async def _setup_diag_shell(self) -> bool:
+        """Enter the diagnostic shell so Docker commands are wrapped for it"""
+        self.logger.info(f"Entering diagnostic shell with command: {self.config.diag_command}")
+        exit_code, _, stderr = await self._execute_raw_command(self.config.diag_command, timeout=15)
+        if exit_code != 0:
+            self.logger.warning(f"Failed to enter diagnostic shell: {stderr}")
+            return False
+        
+        self.in_diag_shell = True
+        if await self._test_docker_access():
+            self.logger.info("Docker now accessible via diagnostic shell")
+            return True
+        self.logger.warning("Entered diagnostic shell but Docker still not accessible")
+        return False
+    
+    async def _execute_raw_command(self, command: str, timeout: int = 30) -> Tuple[int, str, str]:
+        """Execute raw command without any modifications"""
+        if not self.connected or self.conn is None:
+            raise ConnectionError("Not connected to device")
+        
+        try:
+            result = await self.conn.run(command, check=False, timeout=timeout)
+            exit_code = result.exit_status if result.exit_status is not None else -1
+            return exit_code, result.stdout or "", result.stderr or ""
+        except Exception as e:
+            self.logger.error(f"Raw command execution failed: {e}")
+            return -1, "", str(e)
+    
+    async def execute_command(self, command: str, timeout: int = 30) -> Tuple[int, str, str]:
+        """Execute command on remote device with the same sudo/diag handling as DeviceConnector"""
+        prepared_command = _prepare_command_cached(
+            command, self.config.use_sudo_docker, self.config.use_diag_shell,
+            self.in_diag_shell, self.config.diag_command
+        )
+        return await self._execute_raw_command(prepared_command, timeout)
+    
+    async def run_many(self, commands: Sequence[str], timeout: int = 30) -> List[Tuple[int, str, str]]:
+        """Run commands concurrently, each on its own channel, returning results in order"""
+        return list(await asyncio.gather(
+            *(self.execute_command(command, timeout) for command in commands)
+        ))
+    
+    async def disconnect(self):
+        """Close connection to device"""
+        if self.conn is not None:
+            self.conn.close()
+            await self.conn.wait_closed()
+            self.conn = None
+            self.connected = False
+            self.in_diag_shell = False
+            self.logger.info("Disconnected from device")
+    
+    async def __aenter__(self):
+        """Async context manager entry"""
+        if not await self.connect():
+            raise ConnectionError(f"Failed to connect to {self.config.hostname}")
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit"""
+        await self.disconnect()
@@ -4,64 +4,270 @@ Configurable Container Setup
 Handles custom container preparation with environment-preserving single-session execution
 """
 
+import io
+import json
 import logging
+import re
+import shlex
+import threading
 import time
-import tempfile
-from pathlib import Path
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+import uuid
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from functools import lru_cache
 
-from .device_connector import DeviceConnector
+from .device_connector import DeviceConnector, PersistentShell, _DATACLASS_OPTIONS
 
-@dataclass
+# Matches {{name}} placeholders in commands and file content
+_TEMPLATE_RE = re.compile(r"\{\{([^{}]+)\}\}")
+
+def _render_template(text: str, template_vars: Dict[str, Any]) -> str:
+    """Replace every known {{name}} placeholder in one regex pass"""
+    replacements = {name: str(value) for name, value in template_vars.items()}
+    
+    def replace(match):
+        return replacements.get(match.group(1), match.group(0))
+    
+    return _TEMPLATE_RE.sub(replace, text)
+
+@lru_cache(maxsize=1024)
+def _render_template_cached(text: str, template_items: frozenset) -> str:
+    """Memoized _render_template; the same setup is re-rendered for every container"""
+    return _render_template(text, dict(template_items))
+
+@dataclass(frozen=True, **_DATACLASS_OPTIONS)
 class FileEdit:
-    """File editing configuration"""
+    """File editing configuration.
+    
+    The file is rewritten in place, so an existing file keeps its owner, mode and
+    symlink target; a new one is created with the container's umask. The parent
+    directory must already exist. permissions, if set, is applied with chmod after
+    the write.
+    """
     file: str
     content: str
     backup: bool = False
     permissions: Optional[str] = None
+    backup_suffix: Optional[str] = None  # Defaults to .backup_<timestamp>
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_OPTIONS)
 class ContainerSetupConfig:
-    """Container setup configuration"""
-    pre_commands: List[str] = None
-    file_edits: List[FileEdit] = None
+    """Container setup configuration (immutable, so parsed configs can be shared)"""
+    pre_commands: Tuple[str, ...] = ()
+    file_edits: Tuple[FileEdit, ...] = ()
     valgrind_command: str = ""
-    post_commands: List[str] = None
-    cleanup_commands: List[str] = None
+    post_commands: Tuple[str, ...] = ()
+    cleanup_commands: Tuple[str, ...] = ()
     working_dir: Optional[str] = None
     use_single_session: bool = True  # NEW: Enable single session by default
+    # Wall-clock limit for the single-session script, enforced on both the persistent-shell
+    # and the one-shot exec path; defaults to max(120, 5s per command).
+    # Raise it when pre/post commands are slow - Valgrind itself runs in the background.
+    script_timeout: Optional[int] = None
+
+@dataclass(frozen=True, **_DATACLASS_OPTIONS)
+class PreparedSetup:
+    """Setup config with static template variables already substituted.
+    
+    Only the per-run placeholders named in runtime_vars remain to be filled in.
+    """
+    config: ContainerSetupConfig
+    runtime_vars: frozenset = frozenset()
+
+def _build_container_setup_config(config_dict: Dict[str, Any]) -> ContainerSetupConfig:
+    """Build a ContainerSetupConfig from its dictionary form"""
+    
+    # Parse file edits
+    file_edits = tuple(FileEdit(**edit_dict) for edit_dict in config_dict.get('file_edits', ()))
+    
+    return ContainerSetupConfig(
+        pre_commands=tuple(config_dict.get('pre_commands', ())),
+        file_edits=file_edits,
+        valgrind_command=config_dict.get('valgrind_command', ''),
+        post_commands=tuple(config_dict.get('post_commands', ())),
+        cleanup_commands=tuple(config_dict.get('cleanup_commands', ())),
+        working_dir=config_dict.get('working_dir'),
+        use_single_session=config_dict.get('use_single_session', True),
+        script_timeout=config_dict.get('script_timeout')
+    )
+
+@lru_cache(maxsize=32)
+def _parse_container_setup_config_cached(config_key: str) -> ContainerSetupConfig:
+    """Memoized parse keyed on the config's sorted JSON form"""
+    return _build_container_setup_config(json.loads(config_key))
 
 class ConfigurableContainerSetup:
     """Configurable container setup with custom commands and file editing"""
     
+    # Backoff between Valgrind start checks; sums to the previous fixed 3s wait
+    _VALGRIND_POLL_DELAYS = (0.05, 0.2, 1.0, 1.75)
+    
+    # Lists running Valgrind processes in one process; the bracket keeps it from matching itself
+    _VALGRIND_PGREP = 'pgrep -af "[v]algrind"'
+    
+    # Upper bound on concurrent execs; sshd's MaxSessions (default 10) rejects channels beyond it
+    _MAX_PARALLEL_EXECS = 8
+    
+    # Per-command exit marker emitted by batched phase scripts
+    _STEP_EXIT_RE = re.compile(r"^::STEP (\d+) EXIT (\d+)::$", re.MULTILINE)
+    
+    # 'export NAME=value ...' pre-commands, whose variables must reach the Valgrind exec
+    _EXPORT_RE = re.compile(r"^\s*export\s+[A-Za-z_]\w*=")
+    
     def __init__(self, device_connector):
         self.device = device_connector
         self.logger = logging.getLogger(__name__)
         self.template_vars = {}
+        self._template_items = frozenset()
+        # Persistent shells, one per container for the duration of its setup
+        self._shells: Dict[str, PersistentShell] = {}
+        self._shells_lock = threading.Lock()
     
-    def set_template_variables(self, variables: Dict[str, str]):
-        """Set template variables for command substitution"""
-        self.template_vars = variables
+    def set_template_variables(self, variables: Optional[Dict[str, Any]] = None, **kwargs):
+        """Set template variables for command substitution (as a dict and/or keywords)"""
+        self.template_vars = {**(variables or {}), **kwargs}
+        # Hashable snapshot used as the memo key; frozenset caches its own hash
+        try:
+            self._template_items = frozenset(self.template_vars.items())
+        except TypeError:
+            self._template_items = None
     
-    def execute_container_setup(self, container_id: str, config: ContainerSetupConfig) -> bool:
+    def _invocation_template_vars(self, container_id: str) -> Dict[str, Any]:
+        """Template variables for one setup run.
+        
+        Built fresh per call so concurrent setups never share or mutate state;
+        container_id and timestamp default to this run's values unless set explicitly.
+        """
+        return {'container_id': container_id, 'timestamp': int(time.time()), **self.template_vars}
+    
+    def prepare(self, setup_config: ContainerSetupConfig) -> PreparedSetup:
+        """Substitute the static template variables into a setup config once.
+        
+        container_id and timestamp stay as placeholders (unless set explicitly)
+        and are filled in per run; unknown placeholders are reported up front.
+        """
+        runtime_vars = frozenset({'container_id', 'timestamp'} - self.template_vars.keys())
+        unknown = set()
+        
+        def render(text):
+            if not text:
+                return text
+            text = self._substitute_template(text)
+            unknown.update(name for name in _TEMPLATE_RE.findall(text) if name not in runtime_vars)
+            return text
+        
+        def render_all(texts):
+            return tuple(render(text) for text in texts) if texts else ()
+        
+        prepared = replace(
+            setup_config,
+            pre_commands=render_all(setup_config.pre_commands),
+            file_edits=tuple(
+                replace(edit, file=render(edit.file), content=render(edit.content))
+                for edit in setup_config.file_edits or ()
+            ),
+            valgrind_command=render(setup_config.valgrind_command),
+            post_commands=render_all(setup_config.post_commands),
+            cleanup_commands=render_all(setup_config.cleanup_commands),
+            working_dir=render(setup_config.working_dir)
+        )
+        if unknown:
+            self.logger.warning("⚠️ Unknown template variables in setup config: %s", ", ".join(sorted(unknown)))
+        return PreparedSetup(config=prepared, runtime_vars=runtime_vars)
+    
+    def execute_container_setup(self, container_id: str,
+                                config: Union[ContainerSetupConfig, PreparedSetup]) -> bool:
         """Execute container setup using single session bash script"""
         
+        opened_shell = False
         try:
-            self.logger.info(f"🔧 Starting configurable container setup for {container_id}")
+            self.logger.info("🔧 Starting configurable container setup for %s", container_id)
+            prepared = config if isinstance(config, PreparedSetup) else self.prepare(config)
+            config = prepared.config
+            run_vars = {'container_id': container_id, 'timestamp': int(time.time())}
+            template_vars = {name: run_vars[name] for name in prepared.runtime_vars}
+            opened_shell = self._open_shell(container_id)
             
             # Check if we should use single session mode (recommended)
-            if getattr(config, 'use_single_session', True):
-                return self._execute_single_session_setup(container_id, config)
+            if config.use_single_session:
+                return self._execute_single_session_setup(container_id, config, template_vars)
             else:
                 # Fallback to original multi-session approach
-                return self._execute_multi_session_setup(container_id, config)
+                return self._execute_multi_session_setup(container_id, config, template_vars)
                 
         except Exception as e:
-            self.logger.error(f"Container setup failed: {e}")
+            self.logger.error("Container setup failed: %s", e)
+            return False
+        finally:
+            if opened_shell:
+                self._teardown_shell(container_id)
+    
+    def _open_shell(self, container_id: str) -> bool:
+        """Open a persistent shell in the container unless one is already open.
+        
+        Returns True only if a new shell was opened, so the caller knows to tear
+        it down; commands fall back to one-shot docker exec if this fails.
+        """
+        if container_id in self._shells:
+            return False
+        open_shell = getattr(self.device, 'open_persistent_shell', None)
+        if open_shell is None:
+            return False
+        try:
+            shell = open_shell(f"sudo docker exec -i {container_id} sh")
+        except Exception as e:
+            self.logger.debug("Persistent shell unavailable for %s, using one-shot exec: %s", container_id, e)
             return False
+        with self._shells_lock:
+            self._shells[container_id] = shell
+        return True
+    
+    def _teardown_shell(self, container_id: str):
+        """Close the container's persistent shell if one is open"""
+        with self._shells_lock:
+            shell = self._shells.pop(container_id, None)
+        if shell:
+            shell.close()
     
-    def _execute_single_session_setup(self, container_id: str, config: ContainerSetupConfig) -> bool:
+    def _live_shell(self, container_id: str) -> Optional[PersistentShell]:
+        """Return the container's persistent shell, dropping it if it has closed (timeout or EOF)"""
+        shell = self._shells.get(container_id)
+        if shell and shell.closed:
+            with self._shells_lock:
+                if self._shells.get(container_id) is shell:
+                    del self._shells[container_id]
+            return None
+        return shell
+    
+    def _exec_in_container(self, container_id: str, command: str, timeout: int = 60) -> Tuple[int, str, str]:
+        """Run a shell command in the container, through its persistent shell when one is open"""
+        shell = self._live_shell(container_id)
+        if shell:
+            return shell.run(command, timeout, capture_stderr=True)
+        return self.device.execute_command(f"sudo docker exec {container_id} sh -c {shlex.quote(command)}",
+                                           timeout=timeout)
+    
+    def execute_container_setups(self, container_ids: List[str],
+                                 config: Union[ContainerSetupConfig, PreparedSetup],
+                                 max_workers: Optional[int] = None) -> Dict[str, bool]:
+        """Run the same setup on several containers concurrently.
+        
+        Every step is a docker command on the device, so threads spend their
+        time waiting on I/O rather than contending for the GIL. At most
+        max_workers (default 8) containers are set up at once.
+        """
+        if not container_ids:
+            return {}
+        
+        if not isinstance(config, PreparedSetup):
+            config = self.prepare(config)
+        with ThreadPoolExecutor(max_workers=max_workers or min(self._MAX_PARALLEL_EXECS, len(container_ids))) as executor:
+            results = executor.map(lambda cid: self.execute_container_setup(cid, config), container_ids)
+            return dict(zip(container_ids, results))
+    
+    def _execute_single_session_setup(self, container_id: str, config: ContainerSetupConfig,
+                                      template_vars: Optional[Dict[str, Any]] = None) -> bool:
         """Execute all commands in a single bash session to preserve environment variables"""
         
         # Build list of all commands
@@ -69,7 +275,7 @@ class ConfigurableContainerSetup:
         
         # Add pre-commands
         if config.pre_commands:
-            self.logger.info(f"📋 Adding {len(config.pre_commands)} pre-commands")
+            self.logger.info("📋 Adding %s pre-commands", len(config.pre_commands))
             all_commands.extend(config.pre_commands)
         
         # Add Valgrind command if specified
@@ -80,320 +286,405 @@ class ConfigurableContainerSetup:
             if not valgrind_cmd.endswith('&'):
                 valgrind_cmd += ' &'
             all_commands.append(valgrind_cmd)
-            all_commands.append('sleep 3')  # Wait for Valgrind to start
-            all_commands.append('ps aux | grep valgrind | grep -v grep || echo "Valgrind not found"')  # Verify
+            # Wait for Valgrind to start, polling with the same backoff as multi-session mode
+            delays = " ".join(str(delay) for delay in self._VALGRIND_POLL_DELAYS)
+            all_commands.append(
+                f'for delay in {delays}; do {self._VALGRIND_PGREP} >/dev/null && break; sleep "$delay"; done; '
+                f'{self._VALGRIND_PGREP} || echo "Valgrind not found"'
+            )
         
         # Add post-commands
         if config.post_commands:
-            self.logger.info(f"📋 Adding {len(config.post_commands)} post-commands")
+            self.logger.info("📋 Adding %s post-commands", len(config.post_commands))
             all_commands.extend(config.post_commands)
         
-        # Handle file edits separately (they need docker cp)
+        # Handle file edits separately (their content travels over the exec's stdin)
         if config.file_edits:
             self.logger.info("📝 Processing file edits...")
-            for file_edit in config.file_edits:
-                if not self._edit_file(container_id, file_edit):
-                    return False
+            if not self._edit_files(container_id, config.file_edits, template_vars):
+                return False
         
         # Execute all commands in single session if we have any
         if all_commands:
-            return self._execute_commands_as_script(container_id, all_commands, config.working_dir)
+            return self._execute_commands_as_script(container_id, all_commands, config.working_dir, template_vars,
+                                                    timeout=config.script_timeout)
         else:
             self.logger.info("✅ No commands to execute")
             return True
     
-    def _execute_commands_as_script(self, container_id: str, commands: List[str], working_dir: Optional[str] = None) -> bool:
+    def _execute_commands_as_script(self, container_id: str, commands: List[str], working_dir: Optional[str] = None,
+                                    template_vars: Optional[Dict[str, Any]] = None,
+                                    timeout: Optional[int] = None) -> bool:
         """Generate and execute a bash script from command list"""
         
         try:
             # Generate bash script content
-            script_content = self._generate_bash_script(commands, working_dir)
+            script_content = self._generate_bash_script(commands, template_vars=template_vars)
             
-            # Create temporary script file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.sh', delete=False) as tmp_file:
-                tmp_file.write(script_content)
-                tmp_script_path = tmp_file.name
+            self.logger.info("🚀 Executing %s commands in single container session...", len(commands))
             
-            try:
-                # Copy script to container
-                copy_cmd = f"sudo docker cp {tmp_script_path} {container_id}:/tmp/setup_script.sh"
-                exit_code, stdout, stderr = self.device.execute_command(copy_cmd, timeout=30)
-                
-                if exit_code != 0:
-                    self.logger.error(f"Failed to copy script to container: {stderr}")
-                    return False
-                
-                # Execute script in container (single session preserves environment)
-                exec_cmd = f"sudo docker exec {container_id} bash -c 'chmod +x /tmp/setup_script.sh && /tmp/setup_script.sh'"
-                
-                self.logger.info(f"🚀 Executing {len(commands)} commands in single container session...")
-                
-                # Execute with extended timeout
-                total_timeout = len(commands) * 30 + 120  # 30s per command + 2min buffer
-                exit_code, stdout, stderr = self.device.execute_command(exec_cmd, timeout=total_timeout)
-                
-                # Log the output
-                if stdout:
-                    self.logger.info("📋 Script output:")
-                    for line in stdout.split('\n'):
-                        if line.strip():
-                            self.logger.info(f"   {line}")
-                
-                if exit_code == 0:
-                    self.logger.info("✅ Single session script execution completed successfully")
-                else:
-                    self.logger.error(f"❌ Script execution failed: {stderr}")
-                
-                # Clean up script from container
-                cleanup_cmd = f"sudo docker exec {container_id} rm -f /tmp/setup_script.sh"
-                self.device.execute_command(cleanup_cmd, timeout=10)
-                
-                return exit_code == 0
-                
-            finally:
-                # Clean up local temporary file
-                Path(tmp_script_path).unlink(missing_ok=True)
+            # Commands share one session, so bound the whole script by wall-clock time
+            total_timeout = timeout or max(120, len(commands) * 5)
+            exit_code, stdout, stderr = self._run_script_in_container(
+                container_id, script_content, "setup_script.sh", total_timeout, working_dir=working_dir
+            )
+            
+            # Log the output as a single record rather than one per line
+            if stdout and self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("📋 Script output:\n%s",
+                                 "\n".join(f"   {line.rstrip()}" for line in io.StringIO(stdout) if line.strip()))
+            
+            if exit_code == 0:
+                self.logger.info("✅ Single session script execution completed successfully")
+            elif exit_code == 124 and not stderr:
+                # timeout(1) in the container stopped the script
+                self.logger.error("❌ Script execution failed: timed out after %ss", total_timeout)
+            else:
+                self.logger.error("❌ Script execution failed: %s", stderr)
+            
+            return exit_code == 0
                 
         except Exception as e:
-            self.logger.error(f"Error executing commands as script: {e}")
+            self.logger.error("Error executing commands as script: %s", e)
             return False
     
-    def _generate_bash_script(self, commands: List[str], working_dir: Optional[str] = None) -> str:
-        """Generate bash script content from command list"""
-        
-        script_lines = [
-            "#!/bin/bash",
-            "set -e  # Exit on any error",
-            "",
-            "echo '=== Starting Single Session Container Setup ==='",
-            "echo 'Session PID: $$'",
-            "echo 'Environment variables will persist across all commands'",
-            ""
-        ]
-        
-        # Add working directory change if specified
-        if working_dir:
-            script_lines.append(f"cd {working_dir}")
-            script_lines.append(f"echo 'Changed to working directory: {working_dir}'")
-            script_lines.append("")
+    def _run_script_in_container(self, container_id: str, script_content: str,
+                                 script_name: str, timeout: int,
+                                 working_dir: Optional[str] = None) -> Tuple[int, str, str]:
+        """Write a script into the container, run it with bash and remove it, in one exec.
         
-        # Add each command with logging
-        for i, command in enumerate(commands):
-            # Substitute template variables
-            final_command = self._substitute_template(command)
-            
+        The script travels over the exec's stdin (a heredoc on the persistent shell)
+        instead of a local temp file and docker cp. It is still written to a file
+        first so commands in it that read stdin can't consume the script itself.
+        The script unlinks itself once bash has opened it, so no cleanup step is needed.
+        A working_dir is set by docker exec --workdir rather than a cd in the script.
+        
+        timeout bounds the whole run on either path: the connection gives up after it,
+        and the script is also run under the container's timeout(1), when it has one,
+        so a hung command does not outlive the abandoned exec.
+        """
+        container_script = f"/tmp/{script_name}"
+        shebang, newline, body = script_content.partition("\n")
+        if not shebang.startswith("#!"):
+            shebang, newline, body = "", "", script_content
+        script_content = f"{shebang}{newline}rm -f -- \"$0\"\n{body}"
+        if not script_content.endswith("\n"):
+            script_content += "\n"
+        run_cmd = (f"if command -v timeout >/dev/null 2>&1; then timeout {int(timeout)} bash {container_script}; "
+                   f"else bash {container_script}; fi </dev/null")
+        
+        shell = self._live_shell(container_id)
+        if shell:
+            delimiter = f"__SCRIPT_{uuid.uuid4().hex}__"
+            if working_dir:
+                # The shell outlives the script, so only a subshell changes directory
+                run_cmd = f"(cd {shlex.quote(working_dir)} && {run_cmd})"
+            return shell.run(f"cat > {container_script} <<'{delimiter}'\n{script_content}{delimiter}\n{run_cmd}",
+                             timeout, capture_stderr=True)
+        workdir_flag = f"--workdir {shlex.quote(working_dir)} " if working_dir else ""
+        return self.device.execute_command(
+            f"sudo docker exec -i {workdir_flag}{container_id} sh -c {shlex.quote(f'cat > {container_script}; {run_cmd}')}",
+            timeout=timeout, input_data=script_content.encode('utf-8')
+        )
+    
+    def _execute_batched_commands(self, container_id: str, commands: List[str], label: str, stop_on_error: bool,
+                                  template_vars: Optional[Dict[str, Any]] = None) -> Tuple[bool, Dict[int, int]]:
+        """Run a phase's commands in one docker exec and recover per-command exit codes.
+        
+        Each command is wrapped with ::STEP markers so the individual results can
+        still be logged. With stop_on_error the script exits at the first failing
+        command, otherwise every command runs regardless of earlier failures.
+        """
+        script_lines = ["#!/bin/bash"]
+        substitute = self._substitute_template
+        log_info = self.logger.info
+        for i, command in enumerate(commands, 1):
+            final_command = substitute(command, template_vars)
+            log_info("   %s %s: %s", label, i, final_command)
             script_lines.extend([
-                f"# Command {i+1}",
-                f"echo '--- Executing Command {i+1}: {final_command[:50]}{'...' if len(final_command) > 50 else ''} ---'",
+                f"echo '::STEP {i}::'",
                 final_command,
-                "echo '✅ Command completed'",
-                ""
+                "rc=$?",
+                f"echo \"::STEP {i} EXIT $rc::\"",
             ])
+            if stop_on_error:
+                script_lines.append('[ "$rc" -eq 0 ] || exit "$rc"')
+        script_lines.append("exit 0")
+        
+        script_name = f"{label.lower().replace('-', '_')}_batch.sh"
+        exit_code, stdout, stderr = self._run_script_in_container(
+            container_id, "\n".join(script_lines) + "\n", script_name, timeout=len(commands) * 60
+        )
         
-        script_lines.append("echo '=== Single Session Setup Complete ==='")
+        step_results = {}
+        for match in self._STEP_EXIT_RE.finditer(stdout or ""):
+            step_results[int(match.group(1))] = int(match.group(2))
+        
+        for i in range(1, len(commands) + 1):
+            rc = step_results.get(i)
+            if rc == 0:
+                self.logger.info("   ✅ %s %s completed", label, i)
+            elif rc is None:
+                self.logger.warning("   ⚠️ %s %s did not run: %s", label, i, stderr)
+            elif stop_on_error:
+                self.logger.error("   ❌ %s %s failed (exit %s): %s", label, i, rc, stderr)
+            else:
+                self.logger.warning("   ⚠️ %s %s failed (exit %s): %s", label, i, rc, stderr)
         
-        return "\n".join(script_lines)
+        all_ok = exit_code == 0 and len(step_results) == len(commands) and not any(step_results.values())
+        return all_ok, step_results
     
-    def _edit_file(self, container_id: str, file_edit: FileEdit) -> bool:
-        """Edit a single file"""
+    def _generate_bash_script(self, commands: List[str], working_dir: Optional[str] = None,
+                              template_vars: Optional[Dict[str, Any]] = None) -> str:
+        """Generate bash script content from command list
         
+        working_dir is accepted for compatibility only; the exec that runs the
+        script sets the working directory (see _run_script_in_container).
+        """
+        
+        buf = io.StringIO()
+        write = buf.write
+        write("#!/bin/bash\n"
+              "set -e  # Exit on any error\n"
+              "\n"
+              "echo '=== Starting Single Session Container Setup ==='\n"
+              "echo 'Session PID: $$'\n"
+              "echo 'Environment variables will persist across all commands'\n"
+              "\n")
+        
+        # Add each command with logging
+        substitute = self._substitute_template
+        for i, command in enumerate(commands, 1):
+            # Substitute template variables
+            final_command = substitute(command, template_vars)
+            preview = final_command[:50] + ('...' if len(final_command) > 50 else '')
+            write(f"# Command {i}\n"
+                  f"echo '--- Executing Command {i}: {preview} ---'\n"
+                  f"{final_command}\n"
+                  "echo '✅ Command completed'\n"
+                  "\n")
+        
+        write("echo '=== Single Session Setup Complete ==='")
+        
+        return buf.getvalue()
+    
+    def _edit_file(self, container_id: str, file_edit: FileEdit,
+                   template_vars: Optional[Dict[str, Any]] = None,
+                   default_backup_suffix: Optional[str] = None) -> bool:
+        """Edit a single file with one exec that backs it up, writes stdin to it and sets its mode"""
         try:
-            # Substitute template variables in content
-            file_content = self._substitute_template(file_edit.content)
-            file_path = self._substitute_template(file_edit.file)
+            file_path = self._substitute_template(file_edit.file, template_vars)
+            file_content = self._substitute_template(file_edit.content, template_vars)
+            self.logger.info("      📝 Editing %s", file_path)
             
-            self.logger.info(f"      📝 Editing {file_path}")
-            
-            # Create backup if requested
+            quoted_path = shlex.quote(file_path)
+            script = f"cat > {quoted_path}"
             if file_edit.backup:
-                backup_cmd = f"sudo docker exec {container_id} cp {file_path} {file_path}.backup_{int(time.time())}"
-                exit_code, stdout, stderr = self.device.execute_command(backup_cmd, timeout=10)
-                if exit_code == 0:
-                    self.logger.debug(f"      💾 Backup created for {file_path}")
+                backup_path = file_path + (file_edit.backup_suffix or default_backup_suffix
+                                           or f".backup_{int(time.time())}")
+                script = f"cp {quoted_path} {shlex.quote(backup_path)}; {script}"
+            if file_edit.permissions:
+                script += f" && chmod {shlex.quote(file_edit.permissions)} {quoted_path}"
             
-            # Create temporary file with content
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.tmp') as tmp_file:
-                tmp_file.write(file_content)
-                tmp_file_path = tmp_file.name
+            exit_code, stdout, stderr = self.device.execute_command(
+                f"sudo docker exec -i {container_id} sh -c {shlex.quote(script)}",
+                timeout=30, input_data=file_content.encode('utf-8')
+            )
             
-            try:
-                # Copy content to container
-                copy_cmd = f"sudo docker cp {tmp_file_path} {container_id}:{file_path}"
-                exit_code, stdout, stderr = self.device.execute_command(copy_cmd, timeout=30)
-                
-                if exit_code == 0:
-                    self.logger.info(f"      ✅ File {file_path} updated successfully")
-                    
-                    # Set permissions if specified
-                    if file_edit.permissions:
-                        perm_cmd = f"sudo docker exec {container_id} chmod {file_edit.permissions} {file_path}"
-                        self.device.execute_command(perm_cmd, timeout=10)
-                        self.logger.debug(f"      🔒 Permissions set to {file_edit.permissions}")
-                    
-                    return True
-                else:
-                    self.logger.error(f"      ❌ Failed to update {file_path}: {stderr}")
-                    return False
-                    
-            finally:
-                # Clean up temporary file
-                Path(tmp_file_path).unlink(missing_ok=True)
+            if exit_code == 0:
+                self.logger.info("      ✅ File %s updated successfully", file_path)
+                return True
+            else:
+                self.logger.error("      ❌ Failed to update %s: %s", file_path, stderr)
+                return False
                 
         except Exception as e:
-            self.logger.error(f"Error editing file {file_edit.file}: {e}")
+            self.logger.error("Error editing file: %s", e)
             return False
     
-    def _substitute_template(self, text: str) -> str:
-        """Substitute template variables in text"""
-        result = text
-        for key, value in self.template_vars.items():
-            placeholder = f"{{{{{key}}}}}"
-            result = result.replace(placeholder, str(value))
-        return result
+    def _substitute_template(self, text: str, template_vars: Optional[Dict[str, Any]] = None) -> str:
+        """Substitute template variables in text (defaults to the instance variables)"""
+        # Most lines carry no placeholders; skip the memo lookup for them
+        if not text or "{{" not in text:
+            return text
+        if template_vars is None:
+            if self.template_vars and self._template_items is not None:
+                return _render_template_cached(text, self._template_items)
+            template_vars = self.template_vars
+        if not template_vars:
+            return text
+        try:
+            return _render_template_cached(text, frozenset(template_vars.items()))
+        except TypeError:
+            # Unhashable variable values can't be memoized
+            return _render_template(text, template_vars)
     
-    def _execute_multi_session_setup(self, container_id: str, config: ContainerSetupConfig) -> bool:
+    def _execute_multi_session_setup(self, container_id: str, config: ContainerSetupConfig,
+                                     template_vars: Optional[Dict[str, Any]] = None) -> bool:
         """Execute setup using multiple sessions (original approach)"""
         
         self.logger.warning("⚠️ Using multi-session mode - environment variables won't persist between commands")
         
         # Execute pre-commands
-        if config.pre_commands and not self._execute_pre_commands(container_id, config.pre_commands):
+        if config.pre_commands and not self._execute_pre_commands(container_id, config.pre_commands, template_vars):
             return False
         
         # Edit files
-        if config.file_edits and not self._edit_files(container_id, config.file_edits):
+        if config.file_edits and not self._edit_files(container_id, config.file_edits, template_vars):
             return False
         
-        # Start Valgrind
-        if config.valgrind_command and not self._start_valgrind_with_config(container_id, config.valgrind_command):
+        # Start Valgrind; it runs in its own exec, so exported variables are passed along explicitly
+        if config.valgrind_command and not self._start_valgrind_with_config(
+                container_id, config.valgrind_command, template_vars,
+                exports=[command for command in config.pre_commands if self._EXPORT_RE.match(command)]):
             return False
         
         # Execute post-commands
-        if config.post_commands and not self._execute_post_commands(container_id, config.post_commands):
+        if config.post_commands and not self._execute_post_commands(container_id, config.post_commands, template_vars):
             return False
         
         return True
 
     # Keep existing methods for backward compatibility
-    def _execute_pre_commands(self, container_id: str, pre_commands: List[str]) -> bool:
-        """Execute pre-setup commands"""
-        self.logger.info(f"🚀 Executing {len(pre_commands)} pre-commands...")
-        
-        for i, command in enumerate(pre_commands):
-            final_command = self._substitute_template(command)
-            self.logger.info(f"   Command {i+1}: {final_command}")
-            
-            docker_cmd = f"sudo docker exec {container_id} sh -c '{final_command}'"
-            exit_code, stdout, stderr = self.device.execute_command(docker_cmd, timeout=60)
-            
-            if exit_code == 0:
-                self.logger.info(f"   ✅ Pre-command {i+1} completed")
-            else:
-                self.logger.error(f"   ❌ Pre-command {i+1} failed: {stderr}")
-                return False
+    def _execute_pre_commands(self, container_id: str, pre_commands: List[str],
+                              template_vars: Optional[Dict[str, Any]] = None) -> bool:
+        """Execute pre-setup commands, stopping at the first failure"""
+        self.logger.info("🚀 Executing %s pre-commands...", len(pre_commands))
         
-        return True
+        success, _ = self._execute_batched_commands(container_id, pre_commands, "Pre-command",
+                                                    stop_on_error=True, template_vars=template_vars)
+        return success
     
-    def _edit_files(self, container_id: str, file_edits: List[FileEdit]) -> bool:
-        """Edit multiple files"""
-        self.logger.info(f"📝 Editing {len(file_edits)} files...")
+    def _edit_files(self, container_id: str, file_edits: List[FileEdit],
+                    template_vars: Optional[Dict[str, Any]] = None) -> bool:
+        """Edit multiple files, each with its own stdin exec, running the execs concurrently.
         
-        for i, file_edit in enumerate(file_edits):
-            if not self._edit_file(container_id, file_edit):
-                return False
+        Every file goes through _edit_file, so a batch behaves exactly like the same
+        edits applied one at a time (see FileEdit). Edits that target the same path
+        run in order so the last one wins.
+        """
+        self.logger.info("📝 Editing %s files...", len(file_edits))
+        if len(file_edits) == 1:
+            return self._edit_file(container_id, file_edits[0], template_vars)
         
-        return True
+        # One timestamp for every backup in the batch
+        backup_suffix = f".backup_{int(time.time())}"
+        paths = {self._substitute_template(file_edit.file, template_vars) for file_edit in file_edits}
+        workers = min(self._MAX_PARALLEL_EXECS, len(file_edits)) if len(paths) == len(file_edits) else 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda file_edit: self._edit_file(container_id, file_edit, template_vars, backup_suffix),
+                file_edits
+            ))
+        return all(results)
     
-    def _start_valgrind_with_config(self, container_id: str, valgrind_command: str) -> bool:
-        """Start Valgrind with custom configuration"""
+    def _start_valgrind_with_config(self, container_id: str, valgrind_command: str,
+                                    template_vars: Optional[Dict[str, Any]] = None,
+                                    exports: Sequence[str] = ()) -> bool:
+        """Start Valgrind with custom configuration
+        
+        exports are 'export NAME=value' commands from earlier steps. Literal
+        assignments become --env flags on the detached exec; ones needing shell
+        expansion are run ahead of the Valgrind command in the same shell.
+        """
         try:
             # Substitute template variables
-            final_valgrind_cmd = self._substitute_template(valgrind_command)
+            final_valgrind_cmd = self._substitute_template(valgrind_command, template_vars)
             
-            self.logger.info(f"🚀 Starting Valgrind with custom command...")
-            self.logger.info(f"   Command: {final_valgrind_cmd}")
+            self.logger.info("🚀 Starting Valgrind with custom command...")
+            self.logger.info("   Command: %s", final_valgrind_cmd)
+            
+            env_flags = []
+            shell_exports = []
+            for export in exports:
+                export = self._substitute_template(export, template_vars)
+                try:
+                    assignments = shlex.split(export)[1:]
+                except ValueError:
+                    assignments = None
+                if assignments and not any(c in export for c in '$`'):
+                    env_flags.extend(f"--env {shlex.quote(assignment)}" for assignment in assignments)
+                else:
+                    shell_exports.append(export)
+            script = '; '.join(shell_exports + [final_valgrind_cmd])
             
             # Execute Valgrind command in container
-            docker_cmd = f"sudo docker exec -d {container_id} sh -c '{final_valgrind_cmd}'"
+            docker_cmd = " ".join(["sudo docker exec -d", *env_flags, container_id, "sh -c", shlex.quote(script)])
             exit_code, stdout, stderr = self.device.execute_command(docker_cmd, timeout=30)
             
             if exit_code == 0:
                 self.logger.info("✅ Valgrind started successfully with custom configuration")
                 
-                # Wait a moment and verify it's running
-                time.sleep(3)
-                check_cmd = f"sudo docker exec {container_id} ps aux | grep valgrind | grep -v grep"
-                exit_code, stdout, stderr = self.device.execute_command(check_cmd, timeout=10)
-                
-                if exit_code == 0 and stdout.strip():
+                if self._wait_for_valgrind(container_id):
                     self.logger.info("✅ Valgrind process verified running")
                     return True
                 else:
                     self.logger.warning("⚠️ Valgrind may not be running (verification failed)")
                     return True  # Still return True as command executed successfully
             else:
-                self.logger.error(f"❌ Failed to start Valgrind: {stderr}")
+                self.logger.error("❌ Failed to start Valgrind: %s", stderr)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"Error starting Valgrind: {e}")
+            self.logger.error("Error starting Valgrind: %s", e)
             return False
     
-    def _execute_post_commands(self, container_id: str, post_commands: List[str]) -> bool:
-        """Execute post-setup commands"""
-        self.logger.info(f"🔄 Executing {len(post_commands)} post-commands...")
+    def _wait_for_valgrind(self, container_id: str) -> bool:
+        """Poll with backoff until a Valgrind process shows up in the container.
         
-        for i, command in enumerate(post_commands):
-            final_command = self._substitute_template(command)
-            self.logger.info(f"   Command {i+1}: {final_command}")
-            
-            docker_cmd = f"sudo docker exec {container_id} sh -c '{final_command}'"
-            exit_code, stdout, stderr = self.device.execute_command(docker_cmd, timeout=60)
-            
+        pgrep -f is used rather than -x because Valgrind execs its tool binary
+        (e.g. memcheck-amd64-linux), so only the command line mentions valgrind.
+        """
+        for delay in self._VALGRIND_POLL_DELAYS:
+            time.sleep(delay)
+            exit_code, stdout, _ = self._exec_in_container(container_id, self._VALGRIND_PGREP, timeout=10)
             if exit_code == 0:
-                self.logger.info(f"   ✅ Post-command {i+1} completed")
-            else:
-                self.logger.warning(f"   ⚠️ Post-command {i+1} failed: {stderr}")
-                # Don't return False for post-commands, just warn
+                self.logger.debug("Valgrind processes: %s", stdout.strip())
+                return True
+        return False
+    
+    def _execute_post_commands(self, container_id: str, post_commands: List[str],
+                               template_vars: Optional[Dict[str, Any]] = None) -> bool:
+        """Execute post-setup commands"""
+        self.logger.info("🔄 Executing %s post-commands...", len(post_commands))
         
+        # Don't fail the setup for post-commands, failures are only warned about
+        self._execute_batched_commands(container_id, post_commands, "Post-command",
+                                       stop_on_error=False, template_vars=template_vars)
         return True
     
-    def execute_cleanup_commands(self, container_id: str, cleanup_commands: List[str], template_vars: Dict[str, str]):
-        """Execute cleanup commands"""
+    def execute_cleanup_commands(self, container_id: str, cleanup_commands: List[str],
+                                 template_vars: Optional[Dict[str, str]] = None) -> bool:
+        """Execute cleanup commands, returning True only if every command succeeded"""
         if not cleanup_commands:
-            return
+            return True
         
-        self.set_template_variables(template_vars)
-        self.logger.info(f"🧹 Executing {len(cleanup_commands)} cleanup commands...")
+        invocation_vars = self._invocation_template_vars(container_id)
+        if template_vars is not None:
+            invocation_vars.update(template_vars)
+        self.logger.info("🧹 Executing %s cleanup commands...", len(cleanup_commands))
         
-        for i, command in enumerate(cleanup_commands):
-            final_command = self._substitute_template(command)
-            self.logger.info(f"   Cleanup {i+1}: {final_command}")
-            
-            docker_cmd = f"sudo docker exec {container_id} sh -c '{final_command}'"
-            exit_code, stdout, stderr = self.device.execute_command(docker_cmd, timeout=60)
-            
-            if exit_code == 0:
-                self.logger.info(f"   ✅ Cleanup {i+1} completed")
-            else:
-                self.logger.warning(f"   ⚠️ Cleanup {i+1} failed: {stderr}")
+        # Cleanup runs outside a setup, so it needs its own persistent shell
+        opened_shell = self._open_shell(container_id)
+        try:
+            success, _ = self._execute_batched_commands(container_id, cleanup_commands, "Cleanup",
+                                                        stop_on_error=False, template_vars=invocation_vars)
+        finally:
+            if opened_shell:
+                self._teardown_shell(container_id)
+        return success
     
     @staticmethod
     def parse_container_setup_config(config_dict: Dict[str, Any]) -> ContainerSetupConfig:
-        """Parse container setup configuration from dictionary"""
-        
-        # Parse file edits
-        file_edits = []
-        if 'file_edits' in config_dict:
-            for edit_dict in config_dict['file_edits']:
-                file_edits.append(FileEdit(**edit_dict))
-        
-        return ContainerSetupConfig(
-            pre_commands=config_dict.get('pre_commands', []),
-            file_edits=file_edits,
-            valgrind_command=config_dict.get('valgrind_command', ''),
-            post_commands=config_dict.get('post_commands', []),
-            cleanup_commands=config_dict.get('cleanup_commands', []),
-            working_dir=config_dict.get('working_dir'),
-            use_single_session=config_dict.get('use_single_session', True)
-        ) 
\ No newline at end of file
+        """Parse container setup configuration from dictionary.
+        
+        Parsed configs are cached on the dict's JSON form, so identical configs
+        share one (immutable) instance.
+        """
+        try:
+            config_key = json.dumps(config_dict, sort_keys=True)
+        except (TypeError, ValueError):
+            # Not JSON-serializable, so it can't be used as a cache key
+            return _build_container_setup_config(config_dict)
+        return _parse_container_setup_config_cached(config_key)
+
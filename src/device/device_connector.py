@@ -4,16 +4,28 @@ Handles SSH connections to remote devices with network device support
 """
 
 import paramiko
+import re
+import select
+import shlex
+import shutil
 import socket
+import sys
 import time
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Any, Union
 from dataclasses import dataclass
+from functools import lru_cache
 import subprocess
 import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-@dataclass
+# slots=True is only accepted by dataclass on Python 3.10+
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_OPTIONS)
 class DeviceConfig:
     """Configuration for device connection"""
     hostname: str
@@ -27,8 +39,14 @@ class DeviceConfig:
     use_diag_shell: bool = True  # Enter diagnostic shell for Docker access
     use_sudo_docker: bool = True  # Use sudo for Docker commands
     diag_command: str = "diag shell host"  # Command to enter diagnostic shell
+    use_persistent_shell: bool = False  # Run commands through one long-lived 'sh' channel (needs a POSIX login shell)
+    window_size: int = 2 ** 27  # SSH channel window in bytes; wide windows keep large downloads streaming
+    max_packet_size: int = 2 ** 19  # Largest SSH packet we accept, in bytes
+    keepalive_interval: int = 30  # Seconds between SSH keepalives so NAT/firewalls keep idle sessions; 0 disables
+    use_control_master: bool = False  # Run commands through the OpenSSH client over a shared ControlMaster socket
+    control_path: str = "~/.ssh/cm-%r@%h:%p"  # ControlMaster socket; %r/%h/%p are expanded by ssh
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ProcessInfo:
     """Information about a running process"""
     pid: int
@@ -37,9 +55,247 @@ class ProcessInfo:
     memory_usage: int
     cpu_usage: float
 
+class PersistentShell:
+    """A long-lived shell on the device (e.g. 'docker exec -i <id> sh') that runs commands one at a time.
+    
+    Each command's exit status is read back from a unique sentinel line, so many
+    commands share one channel instead of paying for a new session each.
+    """
+    
+    def __init__(self, channel):
+        self.channel = channel
+        self.closed = False
+        self._stdin = channel.makefile_stdin('wb')
+        self._stdout = channel.makefile('rb')
+    
+    def run(self, command: str, timeout: int = 60, capture_stderr: bool = False) -> Tuple[int, str, str]:
+        """Run a command in the shell.
+        
+        stderr is merged into the returned stdout unless capture_stderr is set, in
+        which case it is collected through a per-shell file and returned separately.
+        A command still running after timeout seconds closes the shell and is
+        reported as exit code 1 with the output read so far, like _drain_channel.
+        """
+        sentinel = f"__RC_{uuid.uuid4().hex}_"
+        self.channel.settimeout(timeout)
+        # stdin is detached so commands can't swallow the ones that follow
+        if capture_stderr:
+            err_file = "/tmp/.persistent_shell_$$.err"
+            script = (f"{{ {command}\n}} </dev/null 2>{err_file}; echo \"{sentinel}$?__\"; "
+                      f"cat {err_file}; echo \"{sentinel}END__\"\n")
+        else:
+            script = f"{{ {command}\n}} </dev/null 2>&1; echo \"{sentinel}$?__\"\n"
+        
+        output: List[str] = []
+        try:
+            self._stdin.write(script.encode('utf-8'))
+            self._stdin.flush()
+            
+            marker = self._read_until(sentinel, output)
+            if marker is None:
+                return 1, "".join(output), "Shell closed unexpectedly"
+            exit_code = int(marker.strip().rstrip('_'))
+            
+            errors: List[str] = []
+            if capture_stderr:
+                self._read_until(sentinel, errors)
+            return exit_code, "".join(output), "".join(errors)
+        except socket.timeout:
+            # A timed-out command leaves the shell mid-output, so it can't be reused
+            self.close()
+            return 1, "".join(output), f"Command timed out after {timeout}s"
+        except Exception:
+            # A timed-out command leaves the shell mid-output, so it can't be reused
+            self.close()
+            raise
+    
+    def _read_until(self, sentinel: str, output: List[str]) -> Optional[str]:
+        """Append output up to the next sentinel to output; returns the text after it (None at EOF)"""
+        for raw_line in self._stdout:
+            line = raw_line.decode('utf-8', errors='replace')
+            marker_pos = line.find(sentinel)
+            if marker_pos != -1:
+                output.append(line[:marker_pos])
+                return line[marker_pos + len(sentinel):]
+            output.append(line)
+        
+        self.closed = True
+        return None
+    
+    def close(self):
+        """Exit the shell and close its channel"""
+        self.closed = True
+        try:
+            self._stdin.write(b"rm -f /tmp/.persistent_shell_$$.err; exit\n")
+            self._stdin.flush()
+        except Exception:
+            pass
+        self.channel.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+def _drain_channel(channel: paramiko.Channel, timeout: Optional[float] = None) -> Tuple[int, str, str]:
+    """Read stdout and stderr from an exec channel until the command exits
+    
+    Both streams are pulled as data arrives instead of reading stdout to EOF
+    first, and each is decoded once at the end. If the command is still running
+    after timeout seconds the channel is closed and exit code 1 is returned with
+    the output read so far, as _run_over_control_master does.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    out: List[bytes] = []
+    err: List[bytes] = []
+    while not channel.exit_status_ready():
+        if deadline is not None and time.monotonic() >= deadline:
+            channel.close()
+            return 1, b"".join(out).decode('utf-8', 'replace'), f"Command timed out after {timeout}s"
+        idle = True
+        if channel.recv_ready():
+            out.append(channel.recv(65536))
+            idle = False
+        if channel.recv_stderr_ready():
+            err.append(channel.recv_stderr(65536))
+            idle = False
+        if idle:
+            select.select([channel], [], [], 0.01)
+    
+    # The exit status can arrive ahead of the last output; read both streams to EOF
+    for chunk in iter(lambda: channel.recv(65536), b""):
+        out.append(chunk)
+    for chunk in iter(lambda: channel.recv_stderr(65536), b""):
+        err.append(chunk)
+    return channel.recv_exit_status(), b"".join(out).decode('utf-8'), b"".join(err).decode('utf-8')
+
+@lru_cache(maxsize=512)
+def _prepare_command_cached(command: str, use_sudo: bool, use_diag: bool,
+                            in_diag: bool, diag_command: str) -> str:
+    """Apply sudo and diagnostic shell wrapping to a Docker command"""
+    original_command = command.strip()
+    
+    # Check if this is a Docker command
+    is_docker_command = (
+        original_command.startswith('docker ') or
+        'docker exec' in original_command or
+        'docker ps' in original_command or
+        'docker inspect' in original_command
+    )
+    
+    if not is_docker_command:
+        # Non-Docker command, return as-is
+        return original_command
+    
+    # This is a Docker command, apply transformations
+    prepared_command = original_command
+    
+    # Add sudo if needed
+    if use_sudo and not prepared_command.startswith('sudo '):
+        prepared_command = f"sudo {prepared_command}"
+    
+    # Wrap with diagnostic shell if needed and not already in it
+    if use_diag and not in_diag:
+        prepared_command = f"{diag_command} -c '{prepared_command}'"
+    
+    return prepared_command
+
+class SSHConnectionPool:
+    """Process-wide store of authenticated SSH clients that connectors hand back on disconnect.
+    
+    A connector to the same device and credentials takes an idle client from here
+    instead of paying for TCP setup, key exchange and authentication again. At most
+    max_per_host clients are kept per destination; a background reaper closes
+    clients that have been idle for longer than idle_ttl seconds.
+    """
+    
+    def __init__(self, max_per_host: int = 4, idle_ttl: float = 300.0):
+        self.max_per_host = max_per_host
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._idle: Dict[tuple, Deque[Tuple[paramiko.SSHClient, float]]] = {}
+        self._reaper: Optional[threading.Thread] = None
+    
+    @staticmethod
+    def _key(config: DeviceConfig) -> tuple:
+        return (config.hostname, config.port, config.username, config.key_file, config.password)
+    
+    @staticmethod
+    def _is_alive(client: paramiko.SSHClient) -> bool:
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+    
+    def acquire(self, config: DeviceConfig) -> Optional[paramiko.SSHClient]:
+        """Return an idle, still-connected client for this config, or None"""
+        stale = []
+        client = None
+        with self._lock:
+            idle = self._idle.get(self._key(config))
+            while idle:
+                candidate, _ = idle.pop()
+                if self._is_alive(candidate):
+                    client = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            candidate.close()
+        return client
+    
+    def release(self, client: paramiko.SSHClient, config: DeviceConfig):
+        """Keep a client for reuse, or close it if it is dead or the host is at its limit"""
+        if self._is_alive(client):
+            with self._lock:
+                idle = self._idle.setdefault(self._key(config), deque())
+                if len(idle) < self.max_per_host:
+                    idle.append((client, time.monotonic()))
+                    if self._reaper is None:
+                        self._reaper = threading.Thread(target=self._reap, name="ssh-pool-reaper", daemon=True)
+                        self._reaper.start()
+                    return
+        client.close()
+    
+    def _reap(self):
+        """Close idle clients past their TTL; exits once the pool is empty"""
+        while True:
+            time.sleep(min(self.idle_ttl, 30.0))
+            expired = []
+            with self._lock:
+                deadline = time.monotonic() - self.idle_ttl
+                for key, idle in list(self._idle.items()):
+                    # Oldest entries sit at the left
+                    while idle and idle[0][1] < deadline:
+                        expired.append(idle.popleft()[0])
+                    if not idle:
+                        del self._idle[key]
+                finished = not self._idle
+                if finished:
+                    self._reaper = None
+            for client in expired:
+                client.close()
+            if finished:
+                return
+    
+    def close_all(self):
+        """Close every idle client"""
+        with self._lock:
+            clients = [client for idle in self._idle.values() for client, _ in idle]
+            self._idle.clear()
+        for client in clients:
+            client.close()
+
+# Shared by every DeviceConnector in the process
+_ssh_pool = SSHConnectionPool()
+
 class DeviceConnector:
     """Manages SSH connections to remote devices for memory leak analysis"""
     
+    # get_system_info fields that cannot change while connected
+    _STATIC_SYSINFO_KEYS = ('hostname', 'os_version', 'kernel')
+    # Bytes per SFTP read/write request (paramiko defaults to 32 KiB); stays under
+    # the 256 KiB message limit of OpenSSH's sftp-server
+    _SFTP_REQUEST_SIZE = 1 << 17
+    
     def __init__(self, config: DeviceConfig):
         self.config = config
         self.ssh_client = None
@@ -47,11 +303,26 @@ class DeviceConnector:
         self.connected = False
         self.in_diag_shell = False
         self.docker_accessible = False
+        self._docker_probe_done = False
+        self._static_sysinfo: Optional[Dict[str, str]] = None
+        # Long-lived shell for execute_command; busy or missing means one-shot exec_command
+        self._shell: Optional[PersistentShell] = None
+        self._shell_lock = threading.Lock()
+        self._shell_unavailable = False
+        # SFTP session shared by upload_file/download_file, opened on first use
+        self._sftp: Optional[paramiko.SFTPClient] = None
+        self._sftp_lock = threading.Lock()
+        # remote path -> (size, mtime) of the copy download_if_changed last fetched
+        self._download_stats: Dict[str, Tuple[int, int]] = {}
+        # OpenSSH arguments shared by every command in ControlMaster mode
+        self._ssh_args: Optional[List[str]] = None
         
     def connect(self) -> bool:
         """Establish connection to the device"""
         try:
             if self.config.connection_type.lower() == "ssh":
+                if self.config.use_control_master:
+                    return self._connect_control_master()
                 return self._connect_ssh()
             else:
                 # Could add Telnet support here
@@ -63,24 +334,41 @@ class DeviceConnector:
     def _connect_ssh(self) -> bool:
         """Establish SSH connection"""
         try:
-            self.ssh_client = paramiko.SSHClient()
-            self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            # An earlier connector's session to the same device skips the handshake
+            self.ssh_client = _ssh_pool.acquire(self.config)
+            if self.ssh_client is not None:
+                self.logger.debug(f"Reusing pooled SSH connection to {self.config.hostname}")
+            else:
+                self.ssh_client = paramiko.SSHClient()
+                self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                
+                # Connection parameters
+                connect_params = {
+                    'hostname': self.config.hostname,
+                    'port': self.config.port,
+                    'username': self.config.username,
+                    'timeout': self.config.timeout
+                }
+                
+                # Use key file or password
+                if self.config.key_file:
+                    connect_params['key_filename'] = self.config.key_file
+                else:
+                    connect_params['password'] = self.config.password
+                
+                self.ssh_client.connect(**connect_params)
             
-            # Connection parameters
-            connect_params = {
-                'hostname': self.config.hostname,
-                'port': self.config.port,
-                'username': self.config.username,
-                'timeout': self.config.timeout
-            }
+            # Channels opened from now on (exec, shell, SFTP) use the wider window
+            transport = self.ssh_client.get_transport()
+            transport.default_window_size = self.config.window_size
+            transport.default_max_packet_size = self.config.max_packet_size
             
-            # Use key file or password
-            if self.config.key_file:
-                connect_params['key_filename'] = self.config.key_file
-            else:
-                connect_params['password'] = self.config.password
+            # Keep long idle stretches (e.g. Valgrind runs) from being dropped, and send small
+            # command writes immediately instead of waiting on Nagle
+            transport.set_keepalive(self.config.keepalive_interval)
+            if isinstance(transport.sock, socket.socket):
+                transport.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             
-            self.ssh_client.connect(**connect_params)
             self.connected = True
             self.logger.info(f"Connected to device {self.config.hostname}")
             
@@ -94,12 +382,86 @@ class DeviceConnector:
                 # Test Docker access without diag shell
                 self._test_docker_access()
             
+            if self.config.use_persistent_shell:
+                self._ensure_shell()
+            
             return True
             
         except Exception as e:
             self.logger.error(f"SSH connection failed: {e}")
             return False
     
+    def _connect_control_master(self) -> bool:
+        """Connect through an OpenSSH ControlMaster instead of paramiko
+        
+        The master socket outlives this connector (ControlPersist), so later
+        connects and every 'ssh -S' command reuse its session without a new
+        key exchange. Authentication must work non-interactively (key or agent).
+        Channels, persistent shells and SFTP are not available in this mode;
+        files are copied with scp over the same socket.
+        """
+        # accept-new mirrors the AutoAddPolicy used for paramiko connections
+        options = ["-S", self.config.control_path, "-o", "BatchMode=yes", "-o", "StrictHostKeyChecking=accept-new",
+                   "-o", f"ConnectTimeout={self.config.timeout}",
+                   "-o", f"ServerAliveInterval={self.config.keepalive_interval}"]
+        if self.config.key_file:
+            options += ["-i", self.config.key_file]
+        target = f"{self.config.username}@{self.config.hostname}" if self.config.username else self.config.hostname
+        ssh_args = ["ssh", "-p", str(self.config.port)] + options
+        
+        try:
+            # Join a master left running by an earlier connection, or start one in the background
+            if subprocess.run(ssh_args + ["-O", "check", target], capture_output=True).returncode != 0:
+                result = subprocess.run(ssh_args + ["-M", "-f", "-N", "-o", "ControlPersist=60s", target],
+                                        stdin=subprocess.DEVNULL, capture_output=True,
+                                        timeout=self.config.timeout + 5)
+                if result.returncode != 0:
+                    self.logger.error(f"SSH ControlMaster connection failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+                    return False
+        except (OSError, subprocess.SubprocessError) as e:
+            self.logger.error(f"SSH ControlMaster connection failed: {e}")
+            return False
+        
+        self._ssh_args = ssh_args + [target]
+        self.connected = True
+        self.logger.info(f"Connected to device {self.config.hostname} via SSH ControlMaster")
+        
+        if self.config.use_diag_shell:
+            if self._setup_diag_shell():
+                self.logger.info("Successfully configured diagnostic shell for Docker access")
+            else:
+                self.logger.warning("Failed to configure diagnostic shell, Docker commands may fail")
+        else:
+            self._test_docker_access()
+        
+        return True
+    
+    def _run_over_control_master(self, command: str, timeout: int,
+                                 input_data: Optional[Union[bytes, memoryview]] = None) -> Tuple[int, str, str]:
+        """Run a command with the OpenSSH client over the ControlMaster socket"""
+        try:
+            result = subprocess.run(self._ssh_args + ["--", command], capture_output=True, timeout=timeout,
+                                    input=bytes(input_data) if input_data is not None else None,
+                                    stdin=None if input_data is not None else subprocess.DEVNULL)
+        except subprocess.TimeoutExpired as e:
+            return 1, "", f"Command timed out after {e.timeout}s"
+        return result.returncode, result.stdout.decode('utf-8'), result.stderr.decode('utf-8')
+    
+    def _ensure_shell(self) -> Optional[PersistentShell]:
+        """Return the persistent shell used by execute_command, (re)opening it if needed
+        
+        A shell closed by a failed or timed-out command is reopened on next use.
+        If opening fails, commands use exec_command for the rest of the connection.
+        """
+        if self._shell is None and not self._shell_unavailable:
+            try:
+                self._shell = self.open_persistent_shell("sh", timeout=self.config.timeout)
+                self.logger.debug("Persistent command shell opened")
+            except Exception as e:
+                self._shell_unavailable = True
+                self.logger.warning(f"Persistent shell unavailable, using one channel per command: {e}")
+        return self._shell
+    
     def _setup_diag_shell(self) -> bool:
         """Set up diagnostic shell for Docker access"""
         try:
@@ -117,7 +479,7 @@ class DeviceConnector:
                 self.logger.info("Successfully entered diagnostic shell")
                 
                 # Test Docker access again
-                if self._test_docker_access():
+                if self._test_docker_access(refresh=True):
                     self.logger.info("Docker now accessible via diagnostic shell")
                     return True
                 else:
@@ -131,44 +493,59 @@ class DeviceConnector:
             self.logger.error(f"Error setting up diagnostic shell: {e}")
             return False
     
-    def _test_docker_access(self) -> bool:
-        """Test if Docker is accessible (with or without sudo)"""
-        # Test without sudo first
-        exit_code, stdout, stderr = self._execute_raw_command("docker --version", timeout=10)
-        if exit_code == 0 and "Docker version" in stdout:
-            self.docker_accessible = True
-            self.logger.debug("Docker accessible without sudo")
-            return True
+    def _test_docker_access(self, refresh: bool = False) -> bool:
+        """Test if Docker is accessible (with or without sudo)
         
-        # Test with sudo if configured
+        The result is probed once per connection; pass refresh=True after
+        something that can change it, such as entering the diagnostic shell.
+        """
+        if self._docker_probe_done and not refresh:
+            return self.docker_accessible
+        
+        # Test without sudo first, falling back to sudo in the same round-trip
+        command = "docker --version"
         if self.config.use_sudo_docker:
-            exit_code, stdout, stderr = self._execute_raw_command("sudo docker --version", timeout=10)
-            if exit_code == 0 and "Docker version" in stdout:
-                self.docker_accessible = True
-                self.logger.debug("Docker accessible with sudo")
-                return True
+            command = "docker --version || sudo docker --version"
         
-        self.docker_accessible = False
-        self.logger.debug("Docker not accessible")
-        return False
+        exit_code, stdout, stderr = self._execute_raw_command(command, timeout=10)
+        self.docker_accessible = exit_code == 0 and "Docker version" in stdout
+        self._docker_probe_done = True
+        
+        if self.docker_accessible:
+            self.logger.debug("Docker accessible")
+        else:
+            self.logger.debug("Docker not accessible")
+        return self.docker_accessible
     
     def _execute_raw_command(self, command: str, timeout: int = 30) -> Tuple[int, str, str]:
         """Execute raw command without any modifications"""
+        if self._ssh_args:
+            return self._run_over_control_master(command, timeout)
         if not self.connected or not self.ssh_client:
             raise ConnectionError("Not connected to device")
         
         try:
             stdin, stdout, stderr = self.ssh_client.exec_command(command, timeout=timeout)
-            exit_status = stdout.channel.recv_exit_status()
-            stdout_data = stdout.read().decode('utf-8')
-            stderr_data = stderr.read().decode('utf-8')
-            return exit_status, stdout_data, stderr_data
+            return _drain_channel(stdout.channel, timeout)
         except Exception as e:
             self.logger.error(f"Raw command execution failed: {e}")
             return 1, "", str(e)
     
-    def execute_command(self, command: str, timeout: int = 30) -> Tuple[int, str, str]:
-        """Execute command on remote device with automatic Docker handling"""
+    def execute_command(self, command: str, timeout: int = 30,
+                        input_data: Optional[Union[bytes, memoryview]] = None,
+                        capture_output: bool = True) -> Tuple[int, str, str]:
+        """Execute command on remote device with automatic Docker handling
+        
+        If input_data is given it is written to the command's stdin, which is
+        then closed so the remote command sees EOF. With capture_output=False
+        only the exit status is collected and stdout/stderr come back empty.
+        A command still running after timeout seconds is abandoned and reported
+        with exit code 1 and a "Command timed out" stderr.
+        """
+        if self._ssh_args:
+            exit_code, stdout, stderr = self._run_over_control_master(self._prepare_command(command),
+                                                                      timeout, input_data)
+            return (exit_code, stdout, stderr) if capture_output else (exit_code, "", "")
         if not self.connected or not self.ssh_client:
             raise ConnectionError("Not connected to device")
         
@@ -176,69 +553,172 @@ class DeviceConnector:
             # Prepare command with appropriate context
             final_command = self._prepare_command(command)
             
+            # Reuse the persistent shell when it is idle; stdin payloads need their own channel
+            if (input_data is None and self.config.use_persistent_shell
+                    and self._shell_lock.acquire(blocking=False)):
+                try:
+                    shell = self._ensure_shell()
+                    if shell:
+                        return shell.run(final_command, timeout=timeout, capture_stderr=True)
+                finally:
+                    if self._shell and self._shell.closed:
+                        self._shell = None
+                    self._shell_lock.release()
+            
             stdin, stdout, stderr = self.ssh_client.exec_command(final_command, timeout=timeout)
             
-            # Wait for command completion
-            exit_status = stdout.channel.recv_exit_status()
+            if input_data is not None:
+                # Send straight to the channel; slicing a memoryview while sending is copy-free
+                stdin.channel.sendall(memoryview(input_data))
+                stdin.channel.shutdown_write()
             
-            # Read output
-            stdout_data = stdout.read().decode('utf-8')
-            stderr_data = stderr.read().decode('utf-8')
+            if not capture_output:
+                # Wait for command completion
+                if not stdout.channel.status_event.wait(timeout):
+                    stdout.channel.close()
+                    return 1, "", f"Command timed out after {timeout}s"
+                exit_status = stdout.channel.recv_exit_status()
+                stdout.channel.close()
+                return exit_status, "", ""
             
-            return exit_status, stdout_data, stderr_data
+            # Read both streams while the command runs so neither can fill up and stall it
+            return _drain_channel(stdout.channel, timeout)
             
         except Exception as e:
             self.logger.error(f"Command execution failed: {e}")
             raise
     
-    def _prepare_command(self, command: str) -> str:
-        """Prepare command with diagnostic shell and sudo as needed"""
-        original_command = command.strip()
-        
-        # Check if this is a Docker command
-        is_docker_command = (
-            original_command.startswith('docker ') or
-            'docker exec' in original_command or
-            'docker ps' in original_command or
-            'docker inspect' in original_command
-        )
+    def execute_commands_parallel(self, commands: Sequence[str], timeout: int = 30,
+                                  max_workers: int = 8) -> List[Tuple[int, str, str]]:
+        """Execute independent commands concurrently, returning their results in order
+        
+        Each command runs on its own channel over the one SSH transport (or its
+        own client on the ControlMaster socket), so a batch costs about one
+        round-trip instead of one per command. A command that raises is
+        reported as (-1, "", error) rather than aborting the batch.
+        """
+        if not commands:
+            return []
         
-        if not is_docker_command:
-            # Non-Docker command, return as-is
-            return original_command
+        def run(command: str) -> Tuple[int, str, str]:
+            try:
+                return self.execute_command(command, timeout=timeout)
+            except Exception as e:
+                return -1, "", str(e)
         
-        # This is a Docker command, apply transformations
-        prepared_command = original_command
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(commands))) as executor:
+            return list(executor.map(run, commands))
+    
+    def execute_command_lines(self, command: str, timeout: int = 30) -> Iterator[str]:
+        """Execute command and yield its stdout line by line as it arrives
         
-        # Add sudo if needed
-        if self.config.use_sudo_docker and not prepared_command.startswith('sudo '):
-            prepared_command = f"sudo {prepared_command}"
-            self.logger.debug(f"Added sudo to Docker command: {prepared_command}")
+        Lines are decoded as they are read instead of buffering the whole output
+        as one string, so parsing overlaps the transfer. stderr and the exit
+        status are not reported; use execute_command when they are needed.
+        """
+        final_command = self._prepare_command(command)
+        if self._ssh_args:
+            process = subprocess.Popen(self._ssh_args + ["--", final_command], stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            try:
+                for line in process.stdout:
+                    yield line.decode('utf-8', 'replace').rstrip("\n")
+            finally:
+                process.stdout.close()
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+            return
+        if not self.connected or not self.ssh_client:
+            raise ConnectionError("Not connected to device")
         
-        # Wrap with diagnostic shell if needed and not already in it
-        if self.config.use_diag_shell and not self.in_diag_shell:
-            prepared_command = f"{self.config.diag_command} -c '{prepared_command}'"
-            self.logger.debug(f"Wrapped with diagnostic shell: {prepared_command}")
+        channel = self.ssh_client.get_transport().open_session(timeout=timeout)
+        try:
+            channel.settimeout(timeout)
+            channel.exec_command(final_command)
+            for line in channel.makefile("rb"):
+                yield line.decode('utf-8', 'replace').rstrip("\n")
+        finally:
+            channel.close()
+    
+    def open_command_channel(self, command: str, timeout: int = 30) -> paramiko.Channel:
+        """Start a long-running command and return its channel without waiting for it.
         
-        self.logger.debug(f"Command transformation: '{original_command}' -> '{prepared_command}'")
+        Used for persistent sessions such as 'docker exec -i <id> sh' that are
+        fed commands over stdin; stderr is merged into stdout.
+        """
+        if not self.connected or not self.ssh_client:
+            raise ConnectionError("Not connected to device")
+        
+        channel = self.ssh_client.get_transport().open_session(timeout=timeout)
+        channel.set_combine_stderr(True)
+        channel.exec_command(self._prepare_command(command))
+        return channel
+    
+    def open_persistent_shell(self, command: str = "sh", timeout: int = 30) -> PersistentShell:
+        """Open a shell that runs many commands over one channel; close it (or use 'with') when done"""
+        return PersistentShell(self.open_command_channel(command, timeout=timeout))
+    
+    def _prepare_command(self, command: str) -> str:
+        """Prepare command with diagnostic shell and sudo as needed"""
+        prepared_command = _prepare_command_cached(
+            command, self.config.use_sudo_docker, self.config.use_diag_shell,
+            self.in_diag_shell, self.config.diag_command
+        )
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Command transformation: '{command.strip()}' -> '{prepared_command}'")
         return prepared_command
     
     def disconnect(self):
         """Close connection to device"""
+        if self._shell:
+            self._shell.close()
+            self._shell = None
+        self._shell_unavailable = False
+        if self._sftp:
+            self._sftp.close()
+            self._sftp = None
+        self._download_stats.clear()
+        if self._ssh_args:
+            # The master keeps running for ControlPersist so the next connect can reuse it
+            self._ssh_args = None
+            self.connected = False
+            self.in_diag_shell = False
+            self._docker_probe_done = False
+            self._static_sysinfo = None
+            self.logger.info("Disconnected from device")
         if self.ssh_client:
-            self.ssh_client.close()
+            # The session stays open in the pool for the next connector to this device
+            _ssh_pool.release(self.ssh_client, self.config)
+            self.ssh_client = None
             self.connected = False
+            self.in_diag_shell = False
+            self._docker_probe_done = False
+            self._static_sysinfo = None
             self.logger.info("Disconnected from device")
     
+    @property
+    def sftp(self) -> paramiko.SFTPClient:
+        """SFTP client reused across transfers; reopened if its channel has closed"""
+        with self._sftp_lock:
+            if self._sftp is None or self._sftp.get_channel().closed:
+                self._sftp = self.ssh_client.open_sftp()
+                self._sftp.get_channel().settimeout(self.config.timeout)
+            return self._sftp
+    
     def upload_file(self, local_path: Path, remote_path: str) -> bool:
         """Upload file to remote device"""
+        if self._ssh_args:
+            return self._scp(str(local_path), f"{self._ssh_args[-1]}:{remote_path}")
         if not self.connected or not self.ssh_client:
             raise ConnectionError("Not connected to device")
         
         try:
-            sftp = self.ssh_client.open_sftp()
-            sftp.put(str(local_path), remote_path)
-            sftp.close()
+            # Pipelined writes: requests are sent without waiting for each status
+            with open(local_path, 'rb') as local_file, self.sftp.open(remote_path, 'wb') as remote_file:
+                remote_file.MAX_REQUEST_SIZE = self._SFTP_REQUEST_SIZE
+                remote_file.set_pipelined(True)
+                shutil.copyfileobj(local_file, remote_file, self._SFTP_REQUEST_SIZE)
             self.logger.info(f"Uploaded {local_path} to {remote_path}")
             return True
         except Exception as e:
@@ -247,30 +727,77 @@ class DeviceConnector:
     
     def download_file(self, remote_path: str, local_path: Path) -> bool:
         """Download file from remote device"""
+        if self._ssh_args:
+            return self._scp(f"{self._ssh_args[-1]}:{remote_path}", str(local_path))
         if not self.connected or not self.ssh_client:
             raise ConnectionError("Not connected to device")
         
         try:
-            sftp = self.ssh_client.open_sftp()
-            sftp.get(remote_path, str(local_path))
-            sftp.close()
+            # Prefetch queues reads for the whole file up front instead of one request at a time
+            with self.sftp.open(remote_path, 'rb') as remote_file, open(local_path, 'wb') as local_file:
+                remote_file.MAX_REQUEST_SIZE = self._SFTP_REQUEST_SIZE
+                remote_file.prefetch()
+                shutil.copyfileobj(remote_file, local_file, self._SFTP_REQUEST_SIZE)
             self.logger.info(f"Downloaded {remote_path} to {local_path}")
             return True
         except Exception as e:
             self.logger.error(f"File download failed: {e}")
             return False
     
+    def download_if_changed(self, remote_path: str, local_path: Path) -> bool:
+        """Download a file unless it has not changed since this method last fetched it
+        
+        Meant for polling files that grow while a run is in progress (e.g. Valgrind
+        XML): an unchanged size and mtime costs one stat on the shared SFTP session
+        instead of a transfer. Returns True when the local copy is current.
+        """
+        if self._ssh_args:
+            return self.download_file(remote_path, local_path)
+        if not self.connected or not self.ssh_client:
+            raise ConnectionError("Not connected to device")
+        
+        try:
+            attrs = self.sftp.stat(remote_path)
+        except Exception as e:
+            self.logger.error(f"File download failed: {e}")
+            return False
+        
+        signature = (attrs.st_size, attrs.st_mtime)
+        if self._download_stats.get(remote_path) == signature and Path(local_path).exists():
+            self.logger.debug(f"{remote_path} unchanged, skipping download")
+            return True
+        
+        if not self.download_file(remote_path, local_path):
+            return False
+        self._download_stats[remote_path] = signature
+        return True
+    
+    def _scp(self, source: str, destination: str) -> bool:
+        """Copy a file with scp over the ControlMaster socket"""
+        scp_args = ["scp", "-P", str(self.config.port), "-o", f"ControlPath={self.config.control_path}",
+                    "-o", "BatchMode=yes"]
+        result = subprocess.run(scp_args + [source, destination], stdin=subprocess.DEVNULL, capture_output=True)
+        if result.returncode == 0:
+            self.logger.info(f"Copied {source} to {destination}")
+            return True
+        self.logger.error(f"File copy failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return False
+    
     def create_remote_directory(self, path: str) -> bool:
         """Create directory on remote device"""
         try:
-            exit_code, stdout, stderr = self.execute_command(f"mkdir -p {path}")
+            exit_code, _, _ = self.execute_command(f"mkdir -p -- {shlex.quote(path)}", capture_output=False)
             return exit_code == 0
         except Exception as e:
             self.logger.error(f"Failed to create directory {path}: {e}")
             return False
     
     def get_system_info(self) -> Dict[str, str]:
-        """Get system information from the device"""
+        """Get system information from the device
+        
+        hostname, os_version and kernel are fetched once per connection; the
+        remaining fields are re-queried on every call.
+        """
         info = {}
         
         commands = {
@@ -278,21 +805,37 @@ class DeviceConnector:
             'uptime': 'uptime',
             'memory': 'free -h',
             'disk': 'df -h',
-            'os_version': 'cat /etc/os-release | head -5',
+            'os_version': 'head -5 /etc/os-release',
             'kernel': 'uname -a'
         }
+        static_info = self._static_sysinfo or {}
+        pending = {key: command for key, command in commands.items() if key not in static_info}
         
-        for key, command in commands.items():
-            try:
-                exit_code, stdout, stderr = self.execute_command(command, timeout=10)
-                if exit_code == 0:
-                    info[key] = stdout.strip()
-                else:
-                    info[key] = f"Command failed: {stderr}"
-            except Exception as e:
-                info[key] = f"Error: {e}"
+        # Run every probe in one round-trip; each block is tagged with its
+        # key and followed by its own exit status so results can be split apart
+        script = '; '.join(
+            f"echo '===K==={key}==='; {command}; echo \"===RC===$?\""
+            for key, command in pending.items()
+        )
+        
+        try:
+            _, stdout, stderr = self.execute_command(script, timeout=30)
+        except Exception as e:
+            return {key: static_info.get(key, f"Error: {e}") for key in commands}
+        
+        parts = re.split(r"===K===(\w+)===\n", stdout)
+        for key, block in zip(parts[1::2], parts[2::2]):
+            output, _, rc = block.rpartition('===RC===')
+            if rc.strip() == '0':
+                info[key] = output.strip()
+                if key in self._STATIC_SYSINFO_KEYS:
+                    static_info[key] = info[key]
+            else:
+                info[key] = f"Command failed: {stderr}"
         
-        return info
+        self._static_sysinfo = static_info
+        info.update(static_info)
+        return {key: info.get(key, f"Command failed: {stderr}") for key in commands}
     
     def __enter__(self):
         """Context manager entry"""
@@ -6,16 +6,68 @@ Handles Docker container operations, memory allocation, and containerized proces
 import time
 import logging
 import json
+import re
+import shlex
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Any
 from dataclasses import dataclass
 from datetime import datetime
 
-from .device_connector import DeviceConnector, ProcessInfo
+from .device_connector import DeviceConnector, ProcessInfo, _DATACLASS_OPTIONS
 
-@dataclass
+_MEMORY_UNITS = {'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+def _memory_limit_bytes(memory_limit: str) -> Optional[int]:
+    """Convert a docker memory limit such as '5g' or '512m' to bytes, or None if unparseable"""
+    value = memory_limit.strip().lower()
+    multiplier = _MEMORY_UNITS.get(value[-1:], None)
+    if multiplier is not None:
+        value = value[:-1]
+    else:
+        multiplier = 1
+    return int(value) * multiplier if value.isdigit() else None
+
+def _self_safe_regex(patterns: Iterable[str]) -> str:
+    """Regex for pgrep/pkill -f matching any of the literal patterns
+    
+    Every character is bracketed (e.g. '[c][o][n][f][d]') so the shell running
+    the command never matches its own command line, even when one pattern
+    contains another.
+    """
+    return "|".join("".join(f"[{char}]" for char in pattern) for pattern in patterns)
+
+def _format_port_bindings(ports: Optional[Dict[str, Any]]) -> List[str]:
+    """Render inspect's NetworkSettings.Ports like 'docker port' does, e.g. '830/tcp -> 0.0.0.0:830'"""
+    bindings = []
+    for container_port, host_bindings in (ports or {}).items():
+        for binding in host_bindings or []:
+            host_ip = binding.get('HostIp', '')
+            host_ip = f"[{host_ip}]" if ':' in host_ip else host_ip
+            bindings.append(f"{container_port} -> {host_ip}:{binding.get('HostPort', '')}")
+    return bindings
+
+def _split_ports(field: str) -> Tuple[str, ...]:
+    """Split docker ps' comma-separated Ports column, skipping the split for the common 0/1-port cases"""
+    if ',' in field:
+        return tuple(field.split(','))
+    return (field,) if field else ()
+
+def _format_memory(num_bytes: int) -> str:
+    """Format a byte count the way 'docker stats' does, e.g. '20.55MiB'"""
+    value = float(num_bytes)
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if value < 1024:
+            break
+        value /= 1024
+    else:
+        unit = 'TiB'
+    return f"{value:.4g}{unit}"
+
+@dataclass(frozen=True, **_DATACLASS_OPTIONS)
 class ContainerInfo:
-    """Information about a Docker container"""
+    """Information about a Docker container (immutable, so it is hashable and safe to cache)"""
     container_id: str
     name: str
     image: str
@@ -23,10 +75,10 @@ class ContainerInfo:
     memory_limit: str
     memory_usage: str
     cpu_usage: str
-    ports: List[str]
+    ports: Tuple[str, ...]
     created: str
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_OPTIONS)
 class ContainerConfig:
     """Configuration for container operations"""
     container_name: str = ""
@@ -36,13 +88,239 @@ class ContainerConfig:
     backup_before_modify: bool = True
     timeout_seconds: int = 300
 
+class DockerEventWatcher:
+    """Keeps an in-memory view of the device's running containers current via 'docker events'.
+    
+    Seeded with one 'docker ps', then updated from the event stream on a background
+    thread, so container lookups need no SSH round trip while the stream is alive.
+    """
+    
+    _EVENTS_CMD = ("sudo docker events --filter type=container --filter event=start "
+                   "--filter event=die --filter event=destroy --filter event=rename --format '{{json .}}'")
+    _PS_CMD = "sudo docker ps --no-trunc --format '{{json .}}'"
+    
+    def __init__(self, device_connector: DeviceConnector):
+        self.device = device_connector
+        self.logger = logging.getLogger(__name__)
+        self._containers: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._channel = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        """True while the event stream is being followed"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self) -> bool:
+        """Subscribe to container events and seed the cache; False if either step fails"""
+        try:
+            # Subscribe before seeding so no event between the two is missed
+            self._channel = self.device.open_command_channel(self._EVENTS_CMD)
+            exit_code, stdout, stderr = self.device.execute_command(self._PS_CMD, timeout=10)
+            if exit_code != 0:
+                raise RuntimeError(stderr.strip() or "docker ps failed")
+        except Exception as e:
+            self.logger.debug(f"Docker event stream unavailable, using one-shot queries: {e}")
+            self.stop()
+            return False
+        
+        with self._lock:
+            for line in stdout.splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self._containers[entry['ID']] = entry
+        
+        self._thread = threading.Thread(target=self._follow_events, name="docker-events", daemon=True)
+        self._thread.start()
+        return True
+    
+    def stop(self):
+        """Stop following events; the reader thread exits when the channel closes"""
+        if self._channel is not None:
+            self._channel.close()
+            self._channel = None
+    
+    def containers(self) -> List[Dict[str, str]]:
+        """Snapshot of running containers in 'docker ps --format {{json .}}' form"""
+        with self._lock:
+            return list(self._containers.values())
+    
+    def _follow_events(self):
+        """Apply start/die/destroy/rename events to the cache until the stream ends"""
+        try:
+            for raw_line in self._channel.makefile('rb'):
+                try:
+                    event = json.loads(raw_line)
+                except ValueError:
+                    continue
+                self._apply_event(event)
+        except Exception as e:
+            self.logger.debug(f"Docker event stream ended: {e}")
+        self.logger.debug("Docker event stream closed, falling back to one-shot queries")
+    
+    def _apply_event(self, event: Dict[str, Any]):
+        """Update the cache for one container event"""
+        actor = event.get('Actor', {})
+        container_id = actor.get('ID') or event.get('id', '')
+        attributes = actor.get('Attributes', {})
+        action = event.get('Action') or event.get('status', '')
+        
+        with self._lock:
+            if action == 'start':
+                self._containers[container_id] = {
+                    'ID': container_id,
+                    'Names': attributes.get('name', ''),
+                    'Image': attributes.get('image', event.get('from', '')),
+                    'Status': 'Up',
+                    'Ports': '',
+                    'CreatedAt': ''
+                }
+            elif action in ('die', 'destroy'):
+                self._containers.pop(container_id, None)
+            elif action == 'rename' and container_id in self._containers:
+                self._containers[container_id]['Names'] = attributes.get('name', '')
+
 class DockerManager:
     """Manages Docker containers for memory leak testing"""
     
+    # Valgrind defaults as (option, value) pairs; an empty value renders as a bare flag
+    _VALGRIND_OPTS: Tuple[Tuple[str, str], ...] = (
+        ("tool", "memcheck"),
+        ("leak-check", "full"),
+        ("show-leak-kinds", "all"),
+        ("track-origins", "yes"),
+        ("xml", "yes"),
+    )
+    _NETCONFD_VALGRIND_OPTS: Tuple[Tuple[str, str], ...] = _VALGRIND_OPTS + (
+        ("xml-file", "/tmp/valgrind_netconfd_%p.xml"),
+        ("gen-suppressions", "all"),
+        ("child-silent-after-fork", "yes"),
+        ("trace-children", "yes"),
+        ("verbose", ""),
+    )
+    _PROCESS_VALGRIND_OPTS: Tuple[Tuple[str, str], ...] = _VALGRIND_OPTS + (
+        ("xml-file", "/tmp/valgrind_output_%p.xml"),
+        ("verbose", ""),
+    )
+    # Command prefix for start_process_with_valgrind_in_container when no options are overridden
+    _PROCESS_VALGRIND_CLI: str = " ".join(
+        ["valgrind"] + [f"--{option}={value}" if value else f"--{option}" for option, value in _PROCESS_VALGRIND_OPTS]
+    )
+    
+    # Enhanced NETCONF process patterns - be more comprehensive
+    _NETCONF_PROCESS_PATTERNS: Tuple[str, ...] = (
+        "netconfd", "netconf-server", "confd", "sshd_netconf",
+        "ietf-netconf", "yang-netconf", "restconf", "gnmi",
+        "sysrepod", "sysrepo", "netopeer2", "yanglint"
+    )
+    # The first pattern mentioned in a command line names the process
+    _NETCONF_PROCESS_NAME_RE = re.compile("|".join(map(re.escape, _NETCONF_PROCESS_PATTERNS)), re.IGNORECASE)
+    # Names kill_netconf_processes_in_container also signals with pkill/killall
+    _NETCONF_KILL_PATTERNS: Tuple[str, ...] = ("netconfd", "confd", "netconf-server")
+    # Broad match used when picking NETCONF processes out of a full process listing
+    _NETCONF_COMMAND_RE = re.compile("netconf|confd", re.IGNORECASE)
+    # Container name/image patterns for the deprecated find_netconf_containers()
+    _NETCONF_CONTAINER_RE = re.compile(
+        "netconf|confd|sysrepo|yanglint|netopeer|ui|frontend|backend|api|server", re.IGNORECASE
+    )
+    # Runs in the container: one grep over every /proc/<pid>/cmdline picks the matches, then
+    # only their stat/statm/cmdline are printed. The first line is 'CLK_TCK PAGESIZE uptime'
+    # and each process follows as '==P <pid>', its stat line, its statm line and its
+    # NUL-separated cmdline. The script skips its own PID; an unreadable /proc exits 2.
+    _NETCONF_PROC_SCRIPT = (
+        "cd /proc || exit 2; "
+        f"pids=$(grep -liE '{'|'.join(_NETCONF_PROCESS_PATTERNS)}' [0-9]*/cmdline 2>/dev/null); "
+        "read -r up _ < uptime; "
+        "echo \"$(getconf CLK_TCK 2>/dev/null || echo 100) $(getconf PAGESIZE 2>/dev/null || echo 4096) $up\"; "
+        "for f in $pids; do p=${f%/cmdline}; [ \"$p\" = \"$$\" ] && continue; "
+        "{ read -r st < $p/stat && read -r sm < $p/statm; } 2>/dev/null || continue; "
+        "printf '==P %s\\n%s\\n%s\\n' \"$p\" \"$st\" \"$sm\"; cat $p/cmdline 2>/dev/null; echo; done"
+    )
+    
+    # Runs in the container: prints 'usage inactive_file limit cpu1 cpu2 ns_per_cpu_unit' from the
+    # cgroup v2 files or their v1 equivalents, with the two CPU readings taken 0.1 s apart
+    _CGROUP_STATS_SCRIPT = (
+        "cd /sys/fs/cgroup || exit 2; "
+        "if [ -f memory.current ]; then "
+        "c1=$(sed -n 's/^usage_usec //p' cpu.stat); sleep 0.1; c2=$(sed -n 's/^usage_usec //p' cpu.stat); "
+        "echo \"$(cat memory.current) $(sed -n 's/^inactive_file //p' memory.stat) $(cat memory.max) $c1 $c2 1000\"; "
+        "else "
+        "c1=$(cat cpuacct/cpuacct.usage); sleep 0.1; c2=$(cat cpuacct/cpuacct.usage); "
+        "echo \"$(cat memory/memory.usage_in_bytes) $(sed -n 's/^total_inactive_file //p' memory/memory.stat) "
+        "$(cat memory/memory.limit_in_bytes) $c1 $c2 1\"; fi"
+    )
+    # cgroup v1 reports "no limit" as a huge number rather than 'max'
+    _CGROUP_UNLIMITED = 1 << 60
+    
+    # How long a container's NETCONF process list is served from memory, in seconds
+    _PROCESS_CACHE_TTL = 2.0
+    
     def __init__(self, device_connector: DeviceConnector):
         self.device = device_connector
         self.logger = logging.getLogger(__name__)
+        self._event_watcher: Optional[DockerEventWatcher] = None
+        # key -> (monotonic time stored, value) for _cached
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+    
+    def _cached(self, key: str, ttl: float, fn):
+        """Return fn()'s value, reusing the stored one if it is younger than ttl seconds"""
+        entry = self._cache.get(key)
+        now = time.monotonic()
+        if entry is not None and ttl > 0 and now - entry[0] < ttl:
+            return entry[1]
+        value = fn()
+        self._cache[key] = (now, value)
+        return value
+    
+    def watch_container_events(self) -> bool:
+        """Serve container discovery from a 'docker events' stream instead of repeated 'docker ps' calls"""
+        if self._event_watcher and self._event_watcher.running:
+            return True
+        self._event_watcher = DockerEventWatcher(self.device)
+        if not self._event_watcher.start():
+            self._event_watcher = None
+            return False
+        return True
+    
+    def stop_watching_container_events(self):
+        """Stop the 'docker events' stream started by watch_container_events()"""
+        if self._event_watcher:
+            self._event_watcher.stop()
+            self._event_watcher = None
+    
+    def _list_running_containers(self) -> List[List[str]]:
+        """Running containers as [ID, Names, Image, Status, Ports, CreatedAt] fields"""
+        if self._event_watcher and self._event_watcher.running:
+            return [
+                [c['ID'], c['Names'], c['Image'], c['Status'], c.get('Ports', ''), c.get('CreatedAt', '')]
+                for c in self._event_watcher.containers()
+            ]
         
+        # One docker ps for every pattern; matching happens in Python
+        docker_cmd = "sudo docker ps --format '{{.ID}}\\t{{.Names}}\\t{{.Image}}\\t{{.Status}}\\t{{.Ports}}\\t{{.CreatedAt}}'"
+        exit_code, stdout, stderr = self.device.execute_command(docker_cmd, timeout=10)
+        if exit_code != 0 or not stdout.strip():
+            return []
+        return [line.split('\t', 5) for line in stdout.strip().split('\n') if line.strip()]
+    
+    @staticmethod
+    def _group_by_pattern(containers: List[List[str]], field: int,
+                          patterns: List[str]) -> List[Tuple[str, List[List[str]]]]:
+        """Group containers by the most preferred pattern found in parts[field]
+        
+        Returns (pattern, containers) pairs in pattern order, skipping patterns
+        that matched nothing. Each container lands in exactly one group.
+        """
+        if not patterns:
+            return []
+        any_pattern = re.compile("|".join(map(re.escape, patterns)))
+        groups: Dict[str, List[List[str]]] = {pattern: [] for pattern in patterns}
+        for parts in containers:
+            if any_pattern.search(parts[field]):
+                groups[next(pattern for pattern in patterns if pattern in parts[field])].append(parts)
+        return [(pattern, group) for pattern, group in groups.items() if group]
+    
     def find_target_netconf_container(self, preferred_patterns: List[str] = None) -> Optional[ContainerInfo]:
         """Find the target NETCONF container efficiently - stops on first match"""
         try:
@@ -56,83 +334,44 @@ class DockerManager:
                     'backend', 'api', 'server', 'yanglint', 'netopeer'
                 ]
             
-            # Search for containers using targeted docker commands
-            for pattern in preferred_patterns:
+            # List running containers once, then search them by name in order of preference
+            containers = [parts for parts in self._list_running_containers() if len(parts) >= 4]
+            name_groups = self._group_by_pattern(containers, 1, preferred_patterns)
+            
+            for pattern, candidates in name_groups:
                 self.logger.debug(f"   Searching for pattern: {pattern}")
                 
-                # Use docker ps with name filter for efficiency
-                docker_cmd = f"sudo docker ps --filter name={pattern} --format '{{{{.ID}}}}\\t{{{{.Names}}}}\\t{{{{.Image}}}}\\t{{{{.Status}}}}\\t{{{{.Ports}}}}\\t{{{{.CreatedAt}}}}'"
-                exit_code, stdout, stderr = self.device.execute_command(docker_cmd, timeout=10)
-                
-                if exit_code == 0 and stdout.strip():
-                    lines = stdout.strip().split('\n')
-                    for line in lines:
-                        if line.strip():
-                            parts = line.split('\t')
-                            if len(parts) >= 4:
-                                container_id = parts[0]
-                                container_name = parts[1]
-                                
-                                self.logger.info(f"🎯 Found target container: {container_name} ({container_id[:12]})")
-                                
-                                # Get memory info only for this container
-                                memory_info = self._get_container_memory_info(container_id)
-                                
-                                container_info = ContainerInfo(
-                                    container_id=container_id,
-                                    name=container_name,
-                                    image=parts[2],
-                                    status=parts[3],
-                                    memory_limit=memory_info.get('limit', 'unknown'),
-                                    memory_usage=memory_info.get('usage', 'unknown'),
-                                    cpu_usage=memory_info.get('cpu', 'unknown'),
-                                    ports=parts[4].split(',') if len(parts) > 4 and parts[4] else [],
-                                    created=parts[5] if len(parts) > 5 else 'unknown'
-                                )
-                                
-                                # Verify it has NETCONF processes before returning
-                                if self._verify_netconf_container(container_id):
-                                    self.logger.info(f"✅ Confirmed NETCONF container: {container_name}")
-                                    return container_info
-                                else:
-                                    self.logger.debug(f"   Container {container_name} has no NETCONF processes, continuing search...")
-            
-            # Fallback: search by image patterns
+                for parts, verified in self._verify_netconf_containers(candidates):
+                    container_id = parts[0]
+                    container_name = parts[1]
+                    
+                    self.logger.info(f"🎯 Found target container: {container_name} ({container_id[:12]})")
+                    
+                    # Verify it has NETCONF processes before returning
+                    if verified:
+                        container_info = self._container_info_from_parts(parts)
+                        self.logger.info(f"✅ Confirmed NETCONF container: {container_name}")
+                        return container_info
+                    else:
+                        self.logger.debug(f"   Container {container_name} has no NETCONF processes, continuing search...")
+            
+            # Fallback: search by image patterns, skipping containers already checked above
             self.logger.info("   Trying image-based search...")
             image_patterns = ['netconf', 'confd', 'sysrepo', 'ui']
+            checked = {parts[0] for _, group in name_groups for parts in group}
+            remaining = [parts for parts in containers if parts[0] not in checked]
             
-            for pattern in image_patterns:
-                docker_cmd = f"sudo docker ps --filter ancestor={pattern} --format '{{{{.ID}}}}\\t{{{{.Names}}}}\\t{{{{.Image}}}}\\t{{{{.Status}}}}'"
-                exit_code, stdout, stderr = self.device.execute_command(docker_cmd, timeout=10)
-                
-                if exit_code == 0 and stdout.strip():
-                    lines = stdout.strip().split('\n')
-                    for line in lines:
-                        if line.strip():
-                            parts = line.split('\t')
-                            if len(parts) >= 4:
-                                container_id = parts[0]
-                                container_name = parts[1]
-                                
-                                self.logger.info(f"🎯 Found container by image: {container_name} ({container_id[:12]})")
-                                
-                                if self._verify_netconf_container(container_id):
-                                    memory_info = self._get_container_memory_info(container_id)
-                                    
-                                    container_info = ContainerInfo(
-                                        container_id=container_id,
-                                        name=container_name,
-                                        image=parts[2],
-                                        status=parts[3],
-                                        memory_limit=memory_info.get('limit', 'unknown'),
-                                        memory_usage=memory_info.get('usage', 'unknown'),
-                                        cpu_usage=memory_info.get('cpu', 'unknown'),
-                                        ports=[],
-                                        created='unknown'
-                                    )
-                                    
-                                    self.logger.info(f"✅ Confirmed NETCONF container: {container_name}")
-                                    return container_info
+            for pattern, candidates in self._group_by_pattern(remaining, 2, image_patterns):
+                for parts, verified in self._verify_netconf_containers(candidates):
+                    container_id = parts[0]
+                    container_name = parts[1]
+                    
+                    self.logger.info(f"🎯 Found container by image: {container_name} ({container_id[:12]})")
+                    
+                    if verified:
+                        container_info = self._container_info_from_parts(parts)
+                        self.logger.info(f"✅ Confirmed NETCONF container: {container_name}")
+                        return container_info
             
             self.logger.warning("❌ No target NETCONF container found")
             return None
@@ -141,14 +380,43 @@ class DockerManager:
             self.logger.error(f"Error finding target NETCONF container: {e}")
             return None
     
+    def _container_info_from_parts(self, parts: List[str]) -> ContainerInfo:
+        """Build a ContainerInfo from 'docker ps' fields, fetching memory info for this container only"""
+        memory_info = self._get_container_memory_info(parts[0])
+        
+        return ContainerInfo(
+            container_id=parts[0],
+            name=parts[1],
+            image=parts[2],
+            status=parts[3],
+            memory_limit=memory_info.get('limit', 'unknown'),
+            memory_usage=memory_info.get('usage', 'unknown'),
+            cpu_usage=memory_info.get('cpu', 'unknown'),
+            ports=_split_ports(parts[4]) if len(parts) > 4 else (),
+            created=parts[5] if len(parts) > 5 else 'unknown'
+        )
+    
+    def _verify_netconf_containers(self, candidates: List[List[str]]) -> List[Tuple[List[str], bool]]:
+        """Return (parts, has_netconf) for each candidate in order, checking them concurrently
+        
+        Each check is its own SSH channel, so verifying several candidates costs
+        about one round-trip instead of one per container.
+        """
+        if len(candidates) <= 1:
+            return [(parts, self._verify_netconf_container(parts[0])) for parts in candidates]
+        
+        with ThreadPoolExecutor(max_workers=min(8, len(candidates))) as executor:
+            results = executor.map(self._verify_netconf_container, [parts[0] for parts in candidates])
+            return list(zip(candidates, results))
+    
     def _verify_netconf_container(self, container_id: str) -> bool:
         """Quick verification that container has NETCONF processes"""
         try:
-            # Quick check for NETCONF processes without full parsing
-            ps_cmd = f"sudo docker exec {container_id} ps aux | grep -E 'netconf|confd' | grep -v grep"
-            exit_code, stdout, stderr = self.device.execute_command(ps_cmd, timeout=5)
+            # Only the match count crosses SSH, not a PID per matching process
+            pgrep_cmd = f"sudo docker exec {container_id} pgrep -c -f 'netconf|confd'"
+            exit_code, stdout, stderr = self.device.execute_command(pgrep_cmd, timeout=5)
             
-            has_netconf = exit_code == 0 and stdout.strip()
+            has_netconf = exit_code == 0 and stdout.strip().isdigit() and int(stdout) > 0
             self.logger.debug(f"   Container {container_id[:12]} NETCONF verification: {'✅' if has_netconf else '❌'}")
             return has_netconf
             
@@ -160,30 +428,26 @@ class DockerManager:
         try:
             self.logger.info(f"📊 Getting details for container {container_id[:12]}")
             
-            # Get basic container info
-            inspect_cmd = f"sudo docker inspect {container_id} --format '{{{{.Name}}}}|{{{{.Config.Image}}}}|{{{{.State.Status}}}}|{{{{.Created}}}}'"
-            exit_code, stdout, stderr = self.device.execute_command(inspect_cmd, timeout=10)
+            # Inspect (which includes the port mappings) and stats in one round-trip
+            bundle = self.get_container_bundle(container_id, sections=('inspect_json', 'stats'))
+            exit_code, stdout = bundle['inspect_json']
             
             if exit_code != 0:
-                self.logger.error(f"Failed to inspect container: {stderr}")
-                return None
-            
-            parts = stdout.strip().split('|')
-            if len(parts) < 4:
+                self.logger.error(f"Failed to inspect container: {stdout}")
                 return None
             
-            container_name = parts[0].lstrip('/')  # Remove leading slash
-            image = parts[1]
-            status = parts[2]
-            created = parts[3]
+            data = json.loads(stdout)
+            container_name = data['Name'].lstrip('/')  # Remove leading slash
+            image = data['Config']['Image']
+            status = data['State']['Status']
+            created = data['Created']
             
             # Get memory info
-            memory_info = self._get_container_memory_info(container_id)
+            exit_code, stats_output = bundle['stats']
+            memory_info = self._parse_container_stats(stats_output if exit_code == 0 else "")
             
-            # Get port mappings
-            ports_cmd = f"sudo docker port {container_id}"
-            exit_code, port_output, _ = self.device.execute_command(ports_cmd, timeout=5)
-            ports = port_output.strip().split('\n') if exit_code == 0 and port_output.strip() else []
+            # Port mappings, as 'docker port' would list them
+            ports = tuple(_format_port_bindings((data.get('NetworkSettings') or {}).get('Ports')))
             
             container_info = ContainerInfo(
                 container_id=container_id,
@@ -209,9 +473,14 @@ class DockerManager:
         """List all Docker containers on the device - DEPRECATED: Use find_target_netconf_container() for efficiency"""
         self.logger.warning("⚠️ list_containers() is deprecated for efficiency. Use find_target_netconf_container() instead.")
         try:
-            # Get container information using docker ps
+            # Get container information using docker ps, followed by one 'docker stats'
+            # sample for all of them, in a single round-trip
             cmd_filter = "-a" if show_all else ""
-            docker_cmd = f"sudo docker ps {cmd_filter} --format 'table {{{{.ID}}}}\\t{{{{.Names}}}}\\t{{{{.Image}}}}\\t{{{{.Status}}}}\\t{{{{.Ports}}}}\\t{{{{.CreatedAt}}}}'"
+            docker_cmd = (
+                f"sudo docker ps {cmd_filter} --format 'table {{{{.ID}}}}\\t{{{{.Names}}}}\\t{{{{.Image}}}}\\t{{{{.Status}}}}\\t{{{{.Ports}}}}\\t{{{{.CreatedAt}}}}'"
+                f" && {{ echo ===STATS===; ids=$(sudo docker ps -q {cmd_filter}); "
+                f"[ -z \"$ids\" ] || sudo docker stats --no-stream --format '{{{{json .}}}}' $ids 2>/dev/null; true; }}"
+            )
             
             exit_code, stdout, stderr = self.device.execute_command(docker_cmd)
             
@@ -220,27 +489,29 @@ class DockerManager:
                 return []
             
             containers = []
-            lines = stdout.strip().split('\n')
+            ps_output, _, stats_output = stdout.partition('===STATS===')
+            lines = ps_output.strip().split('\n')
             
             # Skip header line
-            for line in lines[1:]:
-                if line.strip():
-                    parts = line.split('\t')
-                    if len(parts) >= 6:
-                        # Get memory usage for this container
-                        memory_info = self._get_container_memory_info(parts[0])
-                        
-                        containers.append(ContainerInfo(
-                            container_id=parts[0],
-                            name=parts[1],
-                            image=parts[2],
-                            status=parts[3],
-                            memory_limit=memory_info.get('limit', 'unknown'),
-                            memory_usage=memory_info.get('usage', 'unknown'),
-                            cpu_usage=memory_info.get('cpu', 'unknown'),
-                            ports=parts[4].split(',') if parts[4] else [],
-                            created=parts[5]
-                        ))
+            rows = [parts for parts in (line.split('\t', 5) for line in lines[1:] if line.strip()) if len(parts) >= 6]
+            
+            # Memory usage for every container, keyed by short ID
+            stats = self._parse_containers_stats_json(stats_output)
+            
+            for parts in rows:
+                memory_info = stats.get(parts[0][:12], {})
+                
+                containers.append(ContainerInfo(
+                    container_id=parts[0],
+                    name=parts[1],
+                    image=parts[2],
+                    status=parts[3],
+                    memory_limit=memory_info.get('limit', 'unknown'),
+                    memory_usage=memory_info.get('usage', 'unknown'),
+                    cpu_usage=memory_info.get('cpu', 'unknown'),
+                    ports=_split_ports(parts[4]),
+                    created=parts[5]
+                ))
             
             return containers
             
@@ -252,27 +523,18 @@ class DockerManager:
         """Find containers that likely contain NETCONF applications - DEPRECATED: Use find_target_netconf_container() for efficiency"""
         self.logger.warning("⚠️ find_netconf_containers() is deprecated for efficiency. Use find_target_netconf_container() instead.")
         containers = self.list_containers()
-        netconf_containers = []
-        
-        # Common NETCONF container patterns
-        netconf_patterns = [
-            'netconf', 'confd', 'sysrepo', 'yanglint', 'netopeer',
-            'ui', 'frontend', 'backend', 'api', 'server'
-        ]
         
-        for container in containers:
-            # Check container name and image for NETCONF patterns
-            container_text = f"{container.name} {container.image}".lower()
-            
-            for pattern in netconf_patterns:
-                if pattern in container_text:
-                    netconf_containers.append(container)
-                    break
-        
-        return netconf_containers
+        # Check container name and image for common NETCONF container patterns
+        container_search = self._NETCONF_CONTAINER_RE.search
+        return [container for container in containers
+                if container_search(container.name) or container_search(container.image)]
     
     def get_container_processes(self, container_id: str) -> List[ProcessInfo]:
         """Get processes running inside a specific container"""
+        processes = self._get_container_processes_from_host(container_id)
+        if processes is not None:
+            return processes
+        
         try:
             # Use docker exec to run ps inside the container
             ps_cmd = f"sudo docker exec {container_id} ps aux"
@@ -283,17 +545,17 @@ class DockerManager:
                 return []
             
             processes = []
-            lines = stdout.strip().split('\n')
+            lines = iter(stdout.splitlines())
+            next(lines, None)  # Skip header line
             
-            # Skip header line
-            for line in lines[1:]:
+            for line in lines:
                 if line.strip():
                     parts = line.split(None, 10)
                     if len(parts) >= 11:
                         try:
                             processes.append(ProcessInfo(
                                 pid=int(parts[1]),
-                                name=parts[10].split()[0] if parts[10] else parts[0],
+                                name=parts[10].split(None, 1)[0] if parts[10] else parts[0],
                                 command=parts[10] if parts[10] else '',
                                 memory_usage=int(parts[5]) if parts[5].isdigit() else 0,
                                 cpu_usage=float(parts[2]) if parts[2].replace('.', '').isdigit() else 0.0
@@ -307,95 +569,136 @@ class DockerManager:
             self.logger.error(f"Failed to get container processes: {e}")
             return []
     
-    def find_netconf_processes_in_container(self, container_id: str) -> List[ProcessInfo]:
-        """Find all NETCONF-related processes in a container"""
+    def _get_container_processes_from_host(self, container_id: str) -> Optional[List[ProcessInfo]]:
+        """List a container's processes from the host via its cgroup, without a docker exec
+        
+        The cgroup's member PIDs are read on the host and passed to one host 'ps';
+        /proc/<pid>/status NSpid maps each to the PID seen inside the container,
+        which is what later 'docker exec kill' calls expect. Returns None when
+        the cgroup can't be read (e.g. rootless docker) so the caller can fall back.
+        """
+        script = (
+            f"p=$(docker inspect -f '{{{{.State.Pid}}}}' {container_id}) && [ \"$p\" -gt 0 ] || exit 1; "
+            "cg=$(grep -m1 -E '^0::|:memory:' /proc/$p/cgroup | cut -d: -f3); [ -n \"$cg\" ] && [ \"$cg\" != / ] || exit 1; "
+            "d=/sys/fs/cgroup$cg; [ -d \"$d\" ] || d=/sys/fs/cgroup/memory$cg; "
+            "pids=$(find \"$d\" -name cgroup.procs -exec cat {} + 2>/dev/null); [ -n \"$pids\" ] || exit 1; "
+            "ps -o pid=,pcpu=,rss=,args= -p \"$(echo $pids | tr ' ' ,)\" || exit 1; "
+            "echo ===NSPID===; cd /proc && for h in $pids; do echo \"$h/status\"; done | xargs grep -H '^NSpid:' 2>/dev/null; true"
+        )
+        try:
+            exit_code, stdout, stderr = self.device.execute_command(f"sudo sh -c {shlex.quote(script)}", timeout=15)
+        except Exception:
+            return None
+        if exit_code != 0 or '===NSPID===' not in stdout:
+            return None
+        
+        ps_output, _, nspid_output = stdout.partition('===NSPID===')
+        
+        # '<host pid>/status:NSpid:\t<host pid>\t<container pid>'; the last PID is the container's
+        container_pids = {}
+        for line in nspid_output.splitlines():
+            path, _, pids = line.partition(':NSpid:')
+            fields = pids.split()
+            if fields and path.endswith('/status'):
+                container_pids[path[:-len('/status')]] = fields[-1]
+        
+        processes = []
+        for line in ps_output.splitlines():
+            parts = line.split(None, 3)
+            if len(parts) < 4:
+                continue
+            try:
+                processes.append(ProcessInfo(
+                    pid=int(container_pids.get(parts[0], parts[0])),
+                    name=parts[3].split(None, 1)[0],
+                    command=parts[3],
+                    memory_usage=int(parts[2]) if parts[2].isdigit() else 0,
+                    cpu_usage=float(parts[1])
+                ))
+            except ValueError:
+                continue
+        
+        return processes
+    
+    def find_netconf_processes_in_container(self, container_id: str,
+                                            max_age: float = _PROCESS_CACHE_TTL) -> List[ProcessInfo]:
+        """Find all NETCONF-related processes in a container
+        
+        A list fetched less than max_age seconds ago is reused, so callers polling
+        in a tight loop don't each cost a docker exec. Pass max_age=0 after
+        signalling or starting processes to force a fresh listing.
+        """
+        return list(self._cached(f"netconf_processes:{container_id}", max_age,
+                                 lambda: self._find_netconf_processes(container_id)))
+    
+    def _forget_processes(self, container_id: str):
+        """Drop the cached process list after processes in the container were started or signalled"""
+        self._cache.pop(f"netconf_processes:{container_id}", None)
+    
+    def _find_netconf_processes(self, container_id: str) -> List[ProcessInfo]:
+        """List NETCONF-related processes in a container from /proc in one exec
+        
+        Reading /proc avoids running ps over the whole process table, and the
+        RSS comes from statm rather than being estimated from %MEM.
+        """
         try:
             self.logger.info(f"🔍 Finding NETCONF processes in container {container_id}")
             
-            # Enhanced NETCONF process patterns - be more comprehensive
-            netconf_patterns = [
-                "netconfd", "netconf-server", "confd", "sshd_netconf", 
-                "ietf-netconf", "yang-netconf", "restconf", "gnmi",
-                "sysrepod", "sysrepo", "netopeer2", "yanglint"
-            ]
+            # Filter in the container so only matching processes cross SSH; records are parsed as they stream in
+            proc_cmd = f"sudo docker exec {container_id} sh -c {shlex.quote(self._NETCONF_PROC_SCRIPT)}"
+            lines = self.device.execute_command_lines(proc_cmd, timeout=15)
             
-            # Get all processes in container with sudo
-            ps_cmd = f"sudo docker exec {container_id} ps aux"
-            exit_code, stdout, stderr = self.device.execute_command(ps_cmd, timeout=15)
-            
-            if exit_code != 0:
-                self.logger.error(f"Failed to get process list from container: {stderr}")
+            # The script prints nothing at all when it fails, so a missing header means failure
+            header = next(lines, "").split()
+            if len(header) < 3:
+                self.logger.error(f"Failed to get process list from container {container_id}")
                 return []
+            clock_ticks, page_kb, uptime = int(header[0]), int(header[1]) // 1024, float(header[2])
             
             netconf_processes = []
-            lines = stdout.strip().split('\n')
-            
-            # Skip header line
-            for line in lines[1:]:
-                if not line.strip():
+            name_search = self._NETCONF_PROCESS_NAME_RE.search
+            # Matches are reported in one message after the loop, and only collected if it will be logged
+            log_info_enabled = self.logger.isEnabledFor(logging.INFO)
+            found = []
+            
+            for pid_line in lines:
+                # Each record is '==P <pid>', stat, statm and the NUL-separated cmdline, one per line
+                if not pid_line.startswith("==P "):
+                    continue
+                stat_line, statm_line, cmdline = next(lines, ""), next(lines, ""), next(lines, "")
+                record = (pid_line, stat_line, statm_line, cmdline)
+                command = cmdline.replace("\0", " ").strip()
+                match = name_search(command)
+                if not match:
+                    continue
+                found_pattern = match.group(0).lower()
+                try:
+                    pid = int(pid_line[4:])
+                    # Fields after '(comm)': utime and stime are the 12th and 13th, starttime the 20th
+                    stat_fields = stat_line[stat_line.rindex(")") + 2:].split()
+                    cpu_ticks = int(stat_fields[11]) + int(stat_fields[12])
+                    elapsed = uptime - int(stat_fields[19]) / clock_ticks
+                    cpu_usage = round(100.0 * cpu_ticks / clock_ticks / elapsed, 1) if elapsed > 0 else 0.0
+                    
+                    # statm counts pages; resident set size in KB
+                    memory_usage = int(statm_line.split()[1]) * page_kb
+                    
+                    process_info = ProcessInfo(
+                        pid=pid,
+                        name=found_pattern,
+                        command=command,
+                        memory_usage=memory_usage,
+                        cpu_usage=cpu_usage
+                    )
+                    netconf_processes.append(process_info)
+                    if log_info_enabled:
+                        found.append(f"{found_pattern} (PID: {pid}) - {command}")
+                except (ValueError, IndexError) as e:
+                    self.logger.debug(f"Failed to parse process record: {record!r} - {e}")
                     continue
-                
-                # Check if any NETCONF pattern matches - be more aggressive
-                line_lower = line.lower()
-                found_pattern = None
-                for pattern in netconf_patterns:
-                    if pattern in line_lower and 'ps aux' not in line_lower:
-                        found_pattern = pattern
-                        break
-                
-                if found_pattern:
-                    # Parse ps aux output: USER PID %CPU %MEM VSZ RSS TTY STAT START TIME COMMAND
-                    fields = line.split()
-                    if len(fields) >= 11:
-                        try:
-                            pid = int(fields[1])
-                            cpu_usage = float(fields[2])
-                            mem_percent = float(fields[3])
-                            command = ' '.join(fields[10:])
-                            
-                            # Estimate memory usage (rough calculation)
-                            memory_usage = int(mem_percent * 1024)  # Convert % to KB estimate
-                            
-                            process_info = ProcessInfo(
-                                pid=pid,
-                                name=found_pattern,
-                                command=command,
-                                memory_usage=memory_usage,
-                                cpu_usage=cpu_usage
-                            )
-                            netconf_processes.append(process_info)
-                            self.logger.info(f"📋 Found NETCONF process: {found_pattern} (PID: {pid}) - {command}")
-                        except (ValueError, IndexError) as e:
-                            self.logger.debug(f"Failed to parse process line: {line} - {e}")
-                            continue
-            
-            # Also try to find processes by command name directly
-            self.logger.info("🔍 Double-checking with pgrep...")
-            for pattern in ["netconfd", "confd"]:
-                pgrep_cmd = f"sudo docker exec {container_id} pgrep -f {pattern}"
-                exit_code, stdout, stderr = self.device.execute_command(pgrep_cmd, timeout=10)
-                
-                if exit_code == 0 and stdout.strip():
-                    pids = [int(pid.strip()) for pid in stdout.split('\n') if pid.strip().isdigit()]
-                    for pid in pids:
-                        # Check if we already have this PID
-                        if not any(p.pid == pid for p in netconf_processes):
-                            # Get process details
-                            ps_detail_cmd = f"sudo docker exec {container_id} ps -p {pid} -o pid,pcpu,pmem,cmd --no-headers"
-                            exit_code, ps_output, _ = self.device.execute_command(ps_detail_cmd, timeout=5)
-                            if exit_code == 0 and ps_output.strip():
-                                fields = ps_output.strip().split(None, 3)
-                                if len(fields) >= 4:
-                                    process_info = ProcessInfo(
-                                        pid=pid,
-                                        name=pattern,
-                                        command=fields[3],
-                                        memory_usage=int(float(fields[2]) * 1024),
-                                        cpu_usage=float(fields[1])
-                                    )
-                                    netconf_processes.append(process_info)
-                                    self.logger.info(f"📋 Additional NETCONF process: {pattern} (PID: {pid}) - {fields[3]}")
             
+            if found:
+                self.logger.info("📋 Found NETCONF processes:\n   " + "\n   ".join(found))
             self.logger.info(f"🎯 Found {len(netconf_processes)} total NETCONF processes in container {container_id}")
             return netconf_processes
             
@@ -415,60 +718,47 @@ class DockerManager:
                 self.logger.info(f"No NETCONF processes found in container {container_id}")
             else:
                 self.logger.info(f"🛑 Killing {len(netconf_processes)} NETCONF processes by PID")
-                
-                # Kill each process
                 for process in netconf_processes:
                     self.logger.info(f"Killing process PID {process.pid} ({process.name}): {process.command}")
-                    
-                    kill_cmd = f"sudo docker exec {container_id} kill -{signal} {process.pid}"
-                    exit_code, stdout, stderr = self.device.execute_command(kill_cmd, timeout=10)
-                    
-                    if exit_code == 0:
-                        self.logger.info(f"✅ Successfully sent {signal} signal to PID {process.pid}")
-                    else:
-                        self.logger.warning(f"⚠️ Failed to kill PID {process.pid}: {stderr}")
             
             # Method 2: Kill by process name patterns - more comprehensive
             self.logger.info("🛑 Killing processes by name patterns...")
-            kill_patterns = ["netconfd", "confd", "netconf-server"]
+            kill_patterns = list(self._NETCONF_KILL_PATTERNS)
             
-            for pattern in kill_patterns:
-                # Try pkill first
-                pkill_cmd = f"sudo docker exec {container_id} pkill -{signal} -f {pattern}"
-                exit_code, stdout, stderr = self.device.execute_command(pkill_cmd, timeout=10)
-                
-                if exit_code == 0:
-                    self.logger.info(f"✅ pkill successful for pattern: {pattern}")
-                elif "no process found" not in stderr.lower():
-                    self.logger.debug(f"pkill for {pattern}: {stderr}")
-                
-                # Also try killall as backup
-                killall_cmd = f"sudo docker exec {container_id} killall -{signal} {pattern} 2>/dev/null || true"
-                self.device.execute_command(killall_cmd, timeout=5)
+            # Signal every PID, then pkill/killall by name, all in one exec
+            signalled, pkill_matched, stderr = self._signal_pids_in_container(
+                container_id, [process.pid for process in netconf_processes], signal,
+                timeout=10, patterns=self._NETCONF_KILL_PATTERNS
+            )
+            
+            for process in netconf_processes:
+                if process.pid in signalled:
+                    self.logger.info(f"✅ Successfully sent {signal} signal to PID {process.pid}")
+                else:
+                    self.logger.warning(f"⚠️ Failed to kill PID {process.pid}: {stderr}")
+            if pkill_matched:
+                self.logger.info(f"✅ pkill successful for patterns: {', '.join(kill_patterns)}")
             
             # Wait for processes to terminate
             self.logger.info("⏱️ Waiting for processes to terminate...")
-            time.sleep(5)
+            self._wait_for_processes_gone(container_id, kill_patterns, timeout=5, pids=list(signalled))
             
             # Method 3: Check if any processes are still running and force kill
-            remaining_processes = self.find_netconf_processes_in_container(container_id)
+            remaining_processes = self.find_netconf_processes_in_container(container_id, max_age=0)
             if remaining_processes and signal == "TERM":
                 self.logger.warning(f"⚠️ {len(remaining_processes)} processes still running, using KILL signal")
                 
-                # Force kill remaining processes
+                # Force kill remaining processes, and by name as well, in one exec
+                signalled, _, _ = self._signal_pids_in_container(
+                    container_id, [process.pid for process in remaining_processes], "KILL",
+                    timeout=5, patterns=self._NETCONF_KILL_PATTERNS
+                )
                 for process in remaining_processes:
-                    kill_cmd = f"sudo docker exec {container_id} kill -KILL {process.pid}"
-                    exit_code, stdout, stderr = self.device.execute_command(kill_cmd, timeout=5)
-                    if exit_code == 0:
+                    if process.pid in signalled:
                         self.logger.info(f"🔪 Force killed PID {process.pid}")
                 
-                # Also force kill by name
-                for pattern in kill_patterns:
-                    force_kill_cmd = f"sudo docker exec {container_id} pkill -KILL -f {pattern} 2>/dev/null || true"
-                    self.device.execute_command(force_kill_cmd, timeout=5)
-                
-                time.sleep(3)
-                final_check = self.find_netconf_processes_in_container(container_id)
+                self._wait_for_processes_gone(container_id, kill_patterns, timeout=3, pids=list(signalled))
+                final_check = self.find_netconf_processes_in_container(container_id, max_age=0)
                 if final_check:
                     self.logger.error(f"❌ {len(final_check)} processes still running after KILL signal:")
                     for proc in final_check:
@@ -482,6 +772,50 @@ class DockerManager:
             self.logger.error(f"Error killing NETCONF processes in container: {e}")
             return False
 
+    def _wait_for_processes_gone(self, container_id: str, patterns: List[str], timeout: int,
+                                 pids: Iterable[int] = ()) -> bool:
+        """Wait until no process matches any pattern and none of pids is alive, returning as soon as they are gone
+        
+        The polling runs inside one docker exec. Zombies count as gone, since a
+        container whose PID 1 does not reap children may keep them forever.
+        Containers without pgrep just wait out the full timeout.
+        """
+        regex = shlex.quote(_self_safe_regex(patterns))
+        pid_list = " ".join(str(int(pid)) for pid in pids)
+        script = (f"command -v pgrep >/dev/null || {{ sleep {timeout}; exit 1; }}; "
+                  f"alive() {{ for p in {pid_list}; do read -r s < /proc/$p/stat 2>/dev/null && "
+                  f"case ${{s##*\") \"}} in Z*) ;; *) return 0;; esac; done; pgrep -f {regex} >/dev/null; }}; "
+                  f"i=0; while alive && [ $i -lt {timeout * 10} ]; do sleep 0.1; i=$((i+1)); done; ! alive")
+        exit_code, _, _ = self.device.execute_command(
+            f"sudo docker exec {container_id} sh -c {shlex.quote(script)}", timeout=timeout + 10, capture_output=False
+        )
+        return exit_code == 0
+
+    def _signal_pids_in_container(self, container_id: str, pids: List[int], signal: str,
+                                  timeout: int = 10, patterns: Tuple[str, ...] = ()) -> Tuple[Set[int], bool, str]:
+        """Send a signal to several PIDs, and optionally to processes matching patterns, in one docker exec
+        
+        Matching by pattern uses pkill -f with killall as a backup. Returns the
+        PIDs that were signalled, whether pkill matched anything, and the
+        combined stderr of the failures.
+        """
+        sig = shlex.quote(f"-{signal}")
+        script = f"for p in {' '.join(str(int(pid)) for pid in pids)}; do kill {sig} $p && echo $p; done; "
+        if patterns:
+            # killall's names are derived from the regex so the plain names never appear
+            # on this shell's command line, where pkill -f would match them
+            script += (f"re={shlex.quote(_self_safe_regex(patterns))}; pkill {sig} -f \"$re\" && echo pkill; "
+                       f"killall {sig} $(echo \"$re\" | tr -d '[]' | tr '|' ' ') 2>/dev/null; ")
+        script += "true"
+        exit_code, stdout, stderr = self.device.execute_command(
+            f"sudo docker exec {container_id} sh -c {shlex.quote(script)}", timeout=timeout
+        )
+        self._forget_processes(container_id)
+        if exit_code != 0:
+            return set(), False, stderr
+        lines = stdout.split()
+        return {int(pid) for pid in lines if pid.isdigit()}, "pkill" in lines, stderr
+
     def start_netconfd_with_valgrind_in_container(self, 
                                                 container_id: str,
                                                 netconfd_command: str = "/usr/bin/netconfd --foreground",
@@ -498,12 +832,16 @@ class DockerManager:
             for attempt in range(3):
                 self.logger.info(f"   Attempt {attempt + 1}/3 to kill processes...")
                 
-                if not self.kill_netconf_processes_in_container(container_id, "TERM"):
-                    self.logger.warning(f"   Attempt {attempt + 1} - Some processes might still be running")
+                # A TERM kill only succeeds after its own check found nothing left
+                if self.kill_netconf_processes_in_container(container_id, "TERM"):
+                    self.logger.info("   ✅ All NETCONF processes successfully killed")
+                    break
+                self.logger.warning(f"   Attempt {attempt + 1} - Some processes might still be running")
                 
-                # Wait and check
-                time.sleep(2)
-                remaining = self.find_netconf_processes_in_container(container_id)
+                # Wait for stragglers to exit, returning early once they have, then re-scan.
+                # The next attempt's kill reuses this scan from the process cache
+                self._wait_for_processes_gone(container_id, list(self._NETCONF_PROCESS_PATTERNS), timeout=2)
+                remaining = self.find_netconf_processes_in_container(container_id, max_age=0)
                 if not remaining:
                     self.logger.info("   ✅ All NETCONF processes successfully killed")
                     break
@@ -527,18 +865,7 @@ class DockerManager:
             
             # Step 3: Prepare Valgrind command properly
             self.logger.info("⚙️ Step 3: Preparing Valgrind command...")
-            default_valgrind_opts = {
-                "tool": "memcheck",
-                "leak-check": "full",
-                "show-leak-kinds": "all", 
-                "track-origins": "yes",
-                "xml": "yes",
-                "xml-file": "/tmp/valgrind_netconfd_%p.xml",
-                "gen-suppressions": "all",
-                "child-silent-after-fork": "yes",
-                "trace-children": "yes",
-                "verbose": ""
-            }
+            default_valgrind_opts = dict(self._NETCONFD_VALGRIND_OPTS)
             
             if valgrind_options:
                 default_valgrind_opts.update(valgrind_options)
@@ -569,6 +896,7 @@ class DockerManager:
             self.logger.info(f"🐳 Docker command: {docker_cmd}")
             
             exit_code, stdout, stderr = self.device.execute_command(docker_cmd, timeout=30)
+            self._forget_processes(container_id)
             
             if exit_code == 0:
                 self.logger.info("✅ Valgrind + netconfd started successfully")
@@ -577,18 +905,20 @@ class DockerManager:
                 self.logger.info("🔍 Step 5: Finding new Valgrind process PID...")
                 time.sleep(5)  # Wait for process to start
                 
-                # Look for Valgrind process with sudo
-                ps_cmd = f"sudo docker exec {container_id} ps aux | grep valgrind | grep -v grep"
-                exit_code, stdout, stderr = self.device.execute_command(ps_cmd, timeout=10)
+                # Look up Valgrind and plain netconfd in one exec; the brackets keep
+                # pgrep from matching the batch shell's own command line
+                (exit_code, stdout), (netconfd_exit_code, netconfd_stdout) = self._batch_exec(
+                    container_id, ["pgrep -af '[v]algrind'", "pgrep -af '[n]etconfd'"], timeout=10
+                )
                 
                 if exit_code == 0 and stdout.strip():
-                    # Parse the PID from ps output
+                    # Parse the PID from 'pgrep -a' output (PID first, then command line)
                     lines = stdout.strip().split('\n')
                     for line in lines:
                         fields = line.split()
                         if len(fields) >= 2 and 'netconfd' in line:
                             try:
-                                valgrind_pid = int(fields[1])
+                                valgrind_pid = int(fields[0])
                                 self.logger.info(f"🎯 Found Valgrind+netconfd process PID: {valgrind_pid}")
                                 return True, valgrind_pid
                             except ValueError:
@@ -596,9 +926,10 @@ class DockerManager:
                 
                 # Fallback: look for any netconfd process
                 self.logger.info("🔍 Fallback: Looking for netconfd process...")
-                netconf_processes = self.find_netconf_processes_in_container(container_id)
-                if netconf_processes:
-                    new_pid = netconf_processes[0].pid
+                # The first field of 'pgrep -a' output is the PID of the first match
+                fields = netconfd_stdout.split(None, 1) if netconfd_exit_code == 0 else []
+                if fields and fields[0].isdigit():
+                    new_pid = int(fields[0])
                     self.logger.info(f"🎯 Found netconfd process PID: {new_pid}")
                     return True, new_pid
                 else:
@@ -612,6 +943,34 @@ class DockerManager:
             self.logger.error(f"Error starting netconfd with Valgrind: {e}")
             return False, -1
 
+    def _batch_exec(self, container_id: str, commands: List[str], timeout: int = 30) -> List[Tuple[int, str]]:
+        """Run several commands in one docker exec, returning (exit_code, output) for each in order
+        
+        As in get_container_bundle, each command's output is tagged with a marker
+        and followed by its exit status so the results can be split apart.
+        Commands that never reported back get (1, stderr).
+        """
+        script = '; '.join(
+            f'echo ===K==={index}===; {command}; echo "===RC===$?"'
+            for index, command in enumerate(commands)
+        )
+        
+        try:
+            _, stdout, stderr = self.device.execute_command(
+                f"sudo docker exec {container_id} sh -c {shlex.quote(script)}", timeout=timeout
+            )
+        except Exception as e:
+            return [(1, f"Error: {e}")] * len(commands)
+        
+        results = [(1, stderr)] * len(commands)
+        parts = re.split(r"===K===(\d+)===\n", stdout)
+        for index, block in zip(parts[1::2], parts[2::2]):
+            output, _, rc = block.rpartition('===RC===')
+            rc = rc.strip()
+            results[int(index)] = (int(rc) if rc.isdigit() else 1, output)
+        
+        return results
+
     def restart_netconfd_normally_in_container(self, container_id: str, 
                                              netconfd_command: str = "/usr/bin/netconfd --foreground") -> bool:
         """Stop Valgrind+netconfd and restart netconfd normally"""
@@ -623,18 +982,19 @@ class DockerManager:
             
             # Kill Valgrind processes specifically
             valgrind_kill_cmd = f"sudo docker exec {container_id} pkill -KILL -f valgrind || true"
-            self.device.execute_command(valgrind_kill_cmd, timeout=10)
+            self.device.execute_command(valgrind_kill_cmd, timeout=10, capture_output=False)
             
             # Kill all NETCONF processes
             self.kill_netconf_processes_in_container(container_id, "KILL")
             
-            # Wait for cleanup
-            time.sleep(3)
+            # Wait for Valgrind to exit; the NETCONF kill above already waited for its own processes
+            self._wait_for_processes_gone(container_id, ["valgrind"], timeout=3)
             
             # Start netconfd normally in background
             self.logger.info("🚀 Starting netconfd normally...")
             normal_start_cmd = f"sudo docker exec -d {container_id} {netconfd_command}"
             exit_code, stdout, stderr = self.device.execute_command(normal_start_cmd, timeout=15)
+            self._forget_processes(container_id)
             
             if exit_code == 0:
                 self.logger.info("✅ netconfd restarted normally")
@@ -668,8 +1028,8 @@ class DockerManager:
                 return False
             
             # Verify memory update
-            new_memory_info = self._get_container_memory_info(container_id)
-            self.logger.info(f"Container memory updated. New limit: {new_memory_info.get('limit', 'unknown')}")
+            new_limit = self._wait_for_cgroup_memory_limit(container_id, memory_limit)
+            self.logger.info(f"Container memory updated. New limit: {new_limit}")
             
             return True
             
@@ -677,6 +1037,30 @@ class DockerManager:
             self.logger.error(f"Failed to increase container memory: {e}")
             return False
     
+    def _wait_for_cgroup_memory_limit(self, container_id: str, memory_limit: str, timeout: float = 2.0) -> str:
+        """Poll the container's cgroup until its memory limit reads memory_limit, up to timeout seconds
+        
+        Reads memory.max (cgroup v2) or memory.limit_in_bytes (v1) inside one
+        docker exec, which is much cheaper than a 'docker stats' sample.
+        Returns the last value read, or 'unknown'.
+        """
+        target = _memory_limit_bytes(memory_limit)
+        read_cmd = ("cat /sys/fs/cgroup/memory.max /sys/fs/cgroup/memory/memory.limit_in_bytes "
+                    "2>/dev/null | head -1")
+        if target is None:
+            script = read_cmd
+        else:
+            polls = int(timeout * 10)
+            script = (f'i=0; while v=$({read_cmd}); [ "$v" != "{target}" ] && [ $i -lt {polls} ]; '
+                      f'do sleep 0.1; i=$((i+1)); done; echo "$v"')
+        
+        try:
+            exit_code, stdout, stderr = self.device.execute_command(
+                f"sudo docker exec {container_id} sh -c {shlex.quote(script)}", timeout=int(timeout) + 10)
+            return stdout.strip() if exit_code == 0 and stdout.strip() else 'unknown'
+        except Exception:
+            return 'unknown'
+    
     def exec_into_container(self, container_id: str, command: str, interactive: bool = False) -> Tuple[int, str, str]:
         """Execute command inside a container"""
         try:
@@ -700,14 +1084,8 @@ class DockerManager:
                 return False
             
             # Default Valgrind options
-            default_opts = {
-                "tool": "memcheck",
-                "leak-check": "full",
-                "show-leak-kinds": "all",
-                "track-origins": "yes",
-                "xml": "yes",
-                "xml-file": output_file
-            }
+            default_opts = dict(self._VALGRIND_OPTS)
+            default_opts["xml-file"] = output_file
             
             if valgrind_options:
                 default_opts.update(valgrind_options)
@@ -726,6 +1104,7 @@ class DockerManager:
             # Execute in container
             docker_cmd = f"sudo docker exec -d {container_id} {valgrind_cmd}"
             exit_code, stdout, stderr = self.device.execute_command(docker_cmd)
+            self._forget_processes(container_id)
             
             if exit_code == 0:
                 self.logger.info(f"Valgrind started in container {container_id} for PID {target_pid}")
@@ -738,26 +1117,34 @@ class DockerManager:
             self.logger.error(f"Error starting Valgrind in container: {e}")
             return False
 
-    def kill_process_in_container(self, container_id: str, pid: int, signal: str = "TERM") -> bool:
-        """Kill a process inside a container"""
+    def kill_process_in_container(self, container_id: str, pid: int, signal: str = "TERM",
+                                  timeout: int = 2) -> bool:
+        """Kill a process inside a container and wait up to timeout seconds for it to exit
+        
+        Signalling and the exit check run in one docker exec that returns as soon
+        as the process is gone. It exits 2 if the signal could not be sent and 1
+        if the process outlived the timeout.
+        """
         try:
             self.logger.info(f"Killing process PID {pid} in container {container_id} with signal {signal}")
             
-            # Use docker exec to kill process
-            kill_cmd = f"sudo docker exec {container_id} kill -{signal} {pid}"
-            exit_code, stdout, stderr = self.device.execute_command(kill_cmd)
+            # Both values end up inside a shell script, so never pass them through raw
+            sig, pid = shlex.quote(f"-{signal}"), int(pid)
+            script = (f"kill {sig} {pid} || exit 2; i=0; "
+                      f"while kill -0 {pid} 2>/dev/null && [ $i -lt {timeout * 10} ]; do sleep 0.1; i=$((i+1)); done; "
+                      f"! kill -0 {pid} 2>/dev/null")
+            kill_cmd = f"sudo docker exec {container_id} sh -c {shlex.quote(script)}"
+            exit_code, stdout, stderr = self.device.execute_command(kill_cmd, timeout=timeout + 10)
+            self._forget_processes(container_id)
             
             if exit_code == 0:
                 self.logger.info(f"Successfully sent {signal} signal to process {pid}")
-                time.sleep(2)  # Wait for process termination
-                
-                # Verify process is gone
-                if not self.is_process_running_in_container(container_id, pid):
-                    self.logger.info(f"Process {pid} successfully terminated in container")
-                    return True
-                else:
-                    self.logger.warning(f"Process {pid} still running after {signal} signal")
-                    return False
+                self.logger.info(f"Process {pid} successfully terminated in container")
+                return True
+            elif exit_code == 1:
+                self.logger.info(f"Successfully sent {signal} signal to process {pid}")
+                self.logger.warning(f"Process {pid} still running after {signal} signal")
+                return False
             else:
                 self.logger.error(f"Failed to kill process {pid} in container: {stderr}")
                 return False
@@ -766,12 +1153,50 @@ class DockerManager:
             self.logger.error(f"Error killing process in container: {e}")
             return False
 
+    def _terminate_process_in_container(self, container_id: str, pid: int) -> bool:
+        """Send TERM to a process in a container, falling back to KILL if it survives"""
+        # kill_process_in_container already waited for the TERM to take effect
+        return (self.kill_process_in_container(container_id, pid, "TERM")
+                or self.kill_process_in_container(container_id, pid, "KILL"))
+
+    def stop_valgrind_in_container(self, container_id: str, pid: int = -1, timeout: int = 10) -> bool:
+        """Send TERM to Valgrind and wait for it to exit so its output is complete.
+        
+        Signalling and waiting happen in one docker exec that returns as soon as the
+        process is gone, instead of a kill followed by a fixed sleep. A pid of -1
+        (unknown) targets every Valgrind process in the container.
+        """
+        try:
+            if pid > 0:
+                signal_cmd, alive_cmd = f"kill -TERM {pid}", f"kill -0 {pid}"
+            else:
+                signal_cmd, alive_cmd = 'pkill -TERM -f "[v]algrind"', 'pgrep -f "[v]algrind" >/dev/null'
+            
+            polls = timeout * 10
+            script = (f"{signal_cmd} 2>/dev/null; i=0; "
+                      f"while {alive_cmd} 2>/dev/null && [ $i -lt {polls} ]; do sleep 0.1; i=$((i+1)); done; "
+                      f"! {alive_cmd} 2>/dev/null")
+            stop_cmd = f"sudo docker exec {container_id} sh -c {shlex.quote(script)}"
+            exit_code, _, _ = self.device.execute_command(stop_cmd, timeout=timeout + 10, capture_output=False)
+            self._forget_processes(container_id)
+            
+            if exit_code == 0:
+                self.logger.info(f"Valgrind stopped in container {container_id}")
+                return True
+            self.logger.warning(f"Valgrind still running in container {container_id} after {timeout}s")
+            return False
+            
+        except Exception as e:
+            self.logger.error(f"Error stopping Valgrind in container: {e}")
+            return False
+
     def is_process_running_in_container(self, container_id: str, pid: int) -> bool:
         """Check if a process is running inside a container"""
         try:
-            ps_cmd = f"sudo docker exec {container_id} ps -p {pid}"
-            exit_code, stdout, stderr = self.device.execute_command(ps_cmd)
-            return exit_code == 0 and str(pid) in stdout
+            # kill -0 is a shell builtin that only probes the process table, so no ps is spawned
+            check_cmd = f"sudo docker exec {container_id} sh -c 'kill -0 {int(pid)} 2>/dev/null'"
+            exit_code, _, _ = self.device.execute_command(check_cmd)
+            return exit_code == 0
         except Exception:
             return False
 
@@ -783,30 +1208,23 @@ class DockerManager:
                                                background: bool = True) -> Tuple[bool, int]:
         """Start a new process with Valgrind inside a container"""
         try:
-            # Default Valgrind options
-            default_valgrind_opts = {
-                "tool": "memcheck",
-                "leak-check": "full",
-                "show-leak-kinds": "all",
-                "track-origins": "yes",
-                "xml": "yes",
-                "xml-file": "/tmp/valgrind_output_%p.xml",
-                "verbose": ""
-            }
-            
-            if valgrind_options:
+            if not valgrind_options:
+                valgrind_cmd = f"{self._PROCESS_VALGRIND_CLI} {command}"
+            else:
+                # Merge overrides into the default Valgrind options
+                default_valgrind_opts = dict(self._PROCESS_VALGRIND_OPTS)
                 default_valgrind_opts.update(valgrind_options)
-            
-            # Build Valgrind command
-            valgrind_cmd_parts = ["valgrind"]
-            for option, value in default_valgrind_opts.items():
-                if value == "":
-                    valgrind_cmd_parts.append(f"--{option}")
-                else:
-                    valgrind_cmd_parts.append(f"--{option}={value}")
-            
-            valgrind_cmd_parts.append(command)
-            valgrind_cmd = " ".join(valgrind_cmd_parts)
+                
+                # Build Valgrind command
+                valgrind_cmd_parts = ["valgrind"]
+                for option, value in default_valgrind_opts.items():
+                    if value == "":
+                        valgrind_cmd_parts.append(f"--{option}")
+                    else:
+                        valgrind_cmd_parts.append(f"--{option}={value}")
+                
+                valgrind_cmd_parts.append(command)
+                valgrind_cmd = " ".join(valgrind_cmd_parts)
             
             # Prepare docker exec command
             docker_exec_flags = "-d" if background else "-it"
@@ -817,6 +1235,7 @@ class DockerManager:
             
             self.logger.info(f"Starting process with Valgrind in container: {docker_cmd}")
             exit_code, stdout, stderr = self.device.execute_command(docker_cmd, timeout=60)
+            self._forget_processes(container_id)
             
             if exit_code == 0:
                 # Find the new process PID
@@ -849,32 +1268,33 @@ class DockerManager:
             self.logger.info(f"Restarting NETCONF with Valgrind in container {container_id}")
             
             # Step 1: Find NETCONF processes in container
-            netconf_processes = []
-            all_processes = self.get_container_processes(container_id)
-            
-            for process in all_processes:
-                if any(name in process.command.lower() for name in ['netconfd', 'confd', 'netconf']):
-                    netconf_processes.append(process)
+            # One case-insensitive search per command line covers netconfd, confd and netconf
+            command_search = self._NETCONF_COMMAND_RE.search
+            netconf_processes = [process for process in self.get_container_processes(container_id)
+                                 if command_search(process.command)]
             
             # Step 2: Kill existing NETCONF processes
+            all_stopped = True
             if netconf_processes:
                 self.logger.info(f"Found {len(netconf_processes)} NETCONF processes to terminate")
-                for process in netconf_processes:
-                    if netconf_command is None:
-                        # Use the existing command for restart
-                        netconf_command = process.command
-                    
-                    if not self.kill_process_in_container(container_id, process.pid, "TERM"):
-                        # Try KILL if TERM doesn't work
-                        time.sleep(2)
-                        self.kill_process_in_container(container_id, process.pid, "KILL")
+                if netconf_command is None:
+                    # Use the existing command for restart
+                    netconf_command = netconf_processes[0].command
+                
+                # Each kill waits for its process to exit, so run them side by side
+                with ThreadPoolExecutor(max_workers=min(8, len(netconf_processes))) as executor:
+                    all_stopped = all(list(executor.map(
+                        lambda process: self._terminate_process_in_container(container_id, process.pid),
+                        netconf_processes
+                    )))
             else:
                 self.logger.info("No existing NETCONF processes found in container")
                 if netconf_command is None:
                     netconf_command = "/usr/bin/netconfd --foreground"
             
-            # Step 3: Wait for cleanup
-            time.sleep(wait_time)
+            # Step 3: Wait for cleanup; the kills above already waited for every process they confirmed gone
+            if not all_stopped:
+                time.sleep(wait_time)
             
             # Step 4: Start NETCONF with Valgrind
             success, new_pid = self.start_process_with_valgrind_in_container(
@@ -936,28 +1356,135 @@ class DockerManager:
             return False
     
     def _get_container_memory_info(self, container_id: str) -> Dict[str, str]:
-        """Get memory information for a container"""
+        """Get memory information for a container
+        
+        Prefers the container's cgroup files, which are read in one docker exec
+        instead of waiting for a 'docker stats' sample; falls back to
+        'docker stats' if they cannot be read.
+        """
+        memory_info = self._read_cgroup_memory(container_id)
+        if memory_info is not None:
+            return memory_info
+        
         try:
             stats_cmd = f"docker stats {container_id} --no-stream --format 'table {{{{.MemUsage}}}}\\t{{{{.MemPerc}}}}\\t{{{{.CPUPerc}}}}'"
             exit_code, stdout, stderr = self.device.execute_command(stats_cmd)
             
-            if exit_code == 0 and stdout.strip():
-                lines = stdout.strip().split('\n')
-                if len(lines) > 1:  # Skip header
-                    parts = lines[1].split('\t')
-                    if len(parts) >= 3:
-                        return {
-                            'usage': parts[0],
-                            'limit': parts[0].split('/')[-1].strip() if '/' in parts[0] else 'unknown',
-                            'memory_percent': parts[1],
-                            'cpu': parts[2]
-                        }
-            
-            return {'usage': 'unknown', 'limit': 'unknown', 'cpu': 'unknown'}
+            return self._parse_container_stats(stdout if exit_code == 0 else "")
             
         except Exception:
             return {'usage': 'unknown', 'limit': 'unknown', 'cpu': 'unknown'}
     
+    def _read_cgroup_memory(self, container_id: str) -> Optional[Dict[str, str]]:
+        """Read memory and CPU usage from the container's cgroup (v2 or v1), or None on failure
+        
+        Usage excludes inactive page cache, as 'docker stats' does, and CPU is
+        measured over a 0.1 s window.
+        """
+        try:
+            exit_code, stdout, stderr = self.device.execute_command(
+                f"sudo docker exec {container_id} sh -c {shlex.quote(self._CGROUP_STATS_SCRIPT)}", timeout=10
+            )
+            fields = stdout.split()
+            if exit_code != 0 or len(fields) != 6:
+                return None
+            
+            usage, inactive_file, limit, cpu1, cpu2, ns_per_unit = fields
+            usage = max(int(usage) - int(inactive_file), 0)
+            limit = int(limit) if limit.isdigit() and int(limit) < self._CGROUP_UNLIMITED else None
+            # Percent of one CPU, like docker stats: CPU time used per 0.1 s of wall time
+            cpu = (int(cpu2) - int(cpu1)) * int(ns_per_unit) / 1e6
+            
+            limit_str = _format_memory(limit) if limit else 'unlimited'
+            return {
+                'usage': f"{_format_memory(usage)} / {limit_str}",
+                'limit': limit_str,
+                'memory_percent': f"{100.0 * usage / limit:.2f}%" if limit else 'unknown',
+                'cpu': f"{cpu:.2f}%"
+            }
+            
+        except Exception as e:
+            self.logger.debug(f"Failed to read cgroup memory for {container_id}: {e}")
+            return None
+    
+    def _parse_containers_stats_json(self, stdout: str) -> Dict[str, Dict[str, str]]:
+        """Parse "docker stats --format '{{json .}}'" lines into memory info keyed by short (12 character) ID"""
+        stats = {}
+        for line in stdout.splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            usage = entry.get('MemUsage', 'unknown')
+            stats[entry.get('ID', '')[:12]] = {
+                'usage': usage,
+                'limit': usage.split('/')[-1].strip() if '/' in usage else 'unknown',
+                'memory_percent': entry.get('MemPerc', 'unknown'),
+                'cpu': entry.get('CPUPerc', 'unknown')
+            }
+        return stats
+    
+    def _parse_container_stats(self, stdout: str) -> Dict[str, str]:
+        """Parse 'docker stats' table output (MemUsage, MemPerc, CPUPerc)"""
+        if stdout.strip():
+            lines = stdout.strip().split('\n')
+            if len(lines) > 1:  # Skip header
+                parts = lines[1].split('\t', 2)
+                if len(parts) >= 3:
+                    return {
+                        'usage': parts[0],
+                        'limit': parts[0].split('/')[-1].strip() if '/' in parts[0] else 'unknown',
+                        'memory_percent': parts[1],
+                        'cpu': parts[2]
+                    }
+        
+        return {'usage': 'unknown', 'limit': 'unknown', 'cpu': 'unknown'}
+    
+    def get_container_bundle(self, container_id: str, log_lines: int = 20,
+                             sections: Optional[Tuple[str, ...]] = None) -> Dict[str, Tuple[int, str]]:
+        """Collect inspect, stats, ports, logs and processes for a container in one command
+        
+        Returns a dict mapping each section name to (exit_code, output). Pass
+        sections to restrict the bundle to a subset of the names; the full
+        inspect document ('inspect_json') is only included when asked for.
+        """
+        # Double quotes only, so the script survives diag-shell '-c' wrapping
+        commands = {
+            'inspect': f'sudo docker inspect {container_id} --format "{{{{.Name}}}}|{{{{.Config.Image}}}}|{{{{.State.Status}}}}|{{{{.Created}}}}"',
+            'inspect_json': f'sudo docker inspect {container_id} --format "{{{{json .}}}}"',
+            'stats': f'sudo docker stats {container_id} --no-stream --format "table {{{{.MemUsage}}}}\\t{{{{.MemPerc}}}}\\t{{{{.CPUPerc}}}}"',
+            'ports': f'sudo docker port {container_id}',
+            'logs': f'sudo docker logs --tail {log_lines} {container_id} 2>&1',
+            'processes': f'sudo docker exec {container_id} ps aux',
+        }
+        if sections is None:
+            sections = tuple(key for key in commands if key != 'inspect_json')
+        commands = {key: commands[key] for key in sections}
+        
+        script = '; '.join(
+            f'echo ===K==={key}===; {command}; echo "===RC===$?"'
+            for key, command in commands.items()
+        )
+        
+        try:
+            _, stdout, stderr = self.device.execute_command(script, timeout=30)
+        except Exception as e:
+            return {key: (1, f"Error: {e}") for key in commands}
+        
+        bundle = {}
+        parts = re.split(r"===K===(\w+)===\n", stdout)
+        for key, block in zip(parts[1::2], parts[2::2]):
+            output, _, rc = block.rpartition('===RC===')
+            rc = rc.strip()
+            bundle[key] = (int(rc) if rc.isdigit() else 1, output if rc == '0' or output else stderr)
+        
+        for key in commands:
+            bundle.setdefault(key, (1, stderr))
+        
+        return bundle
+    
     def _get_container_config(self, container_id: str) -> Dict[str, Any]:
         """Get current container configuration"""
         try:
@@ -977,7 +1504,7 @@ class DockerManager:
         try:
             backup_file = f"/tmp/container_backup_{container_id}_{int(time.time())}.json"
             backup_cmd = f"echo '{json.dumps(config)}' > {backup_file}"
-            self.device.execute_command(backup_cmd)
+            self.device.execute_command(backup_cmd, capture_output=False)
             self.logger.info(f"Container config backed up to {backup_file}")
         except Exception as e:
             self.logger.warning(f"Failed to backup container config: {e}")
@@ -1061,7 +1588,7 @@ class DockerManager:
             if success:
                 # Try to find the Valgrind process PID
                 time.sleep(3)
-                ps_cmd = f"sudo docker exec {container_id} ps aux | grep valgrind | grep -v grep"
+                ps_cmd = f"sudo docker exec {container_id} pgrep -af valgrind"
                 exit_code, stdout, stderr = self.device.execute_command(ps_cmd, timeout=10)
                 
                 valgrind_pid = -1
@@ -1071,7 +1598,7 @@ class DockerManager:
                         fields = line.split()
                         if len(fields) >= 2 and 'netconfd' in line:
                             try:
-                                valgrind_pid = int(fields[1])
+                                valgrind_pid = int(fields[0])
                                 break
                             except ValueError:
                                 continue
@@ -31,7 +31,7 @@ class CIIntegration:
     def __init__(self, config: CIConfig = None):
         self.config = config or CIConfig()
         self.trend_analyzer = TrendAnalyzer()
-        self.impact_analyzer = ImpactAnalyzer()
+        self.impact_analyzer = ImpactAnalyzer(collect_reasoning=False)
     
     def analyze_for_ci(self, leak_db: LeakDatabase, version: str = "", build_id: str = "") -> Dict[str, Any]:
         """Perform analysis suitable for CI/CD environments"""
@@ -3,6 +3,7 @@ Data models for memory leak information
 """
 
 from dataclasses import dataclass
+from functools import cached_property
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -48,9 +49,9 @@ class MemoryLeak:
     source_file: Optional[str] = None
     timestamp: Optional[datetime] = None
     
-    @property
+    @cached_property
     def primary_location(self) -> str:
-        """Get the primary location where the leak occurred"""
+        """Get the primary location where the leak occurred (computed once per leak)"""
         if self.stack_trace:
             frame = self.stack_trace[0]
             return str(frame)
@@ -6,6 +6,8 @@ Demonstrates the new flexible approach to container preparation with custom comm
 
 import sys
 import logging
+import subprocess
+import tempfile
 from pathlib import Path
 
 # Add src directory to path
@@ -14,7 +16,8 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 from src.device.configurable_container_setup import (
     ConfigurableContainerSetup, 
     ContainerSetupConfig, 
-    FileEdit
+    FileEdit,
+    _render_template_cached
 )
 
 def setup_logging():
@@ -151,6 +154,123 @@ def test_config_parsing():
         print(f"❌ Configuration parsing test FAILED: {e}")
         return False
 
+class ScriptRunningDevice:
+    """Mock device that runs the script sent on stdin with the local bash, as the container would"""
+    
+    def __init__(self):
+        self.commands = []
+        self.scripts = []
+    
+    def execute_command(self, cmd, timeout=30, input_data=None):
+        self.commands.append(cmd)
+        if input_data is None:
+            return 0, "", ""
+        script = bytes(input_data).decode('utf-8')
+        self.scripts.append(script)
+        # The script removes itself ("$0") once bash has opened it
+        with tempfile.NamedTemporaryFile('w', suffix='.sh', delete=False) as f:
+            f.write(script)
+        result = subprocess.run(['bash', f.name], capture_output=True, text=True, timeout=timeout)
+        return result.returncode, result.stdout, result.stderr
+
+def test_batched_command_exit_codes():
+    """Test per-command exit code recovery from a batched phase script"""
+    print("\n" + "="*80)
+    print("🧪 TESTING BATCHED COMMAND EXIT CODES")
+    print("="*80)
+    
+    commands = ["echo first", "(exit 3)", "echo never reached"]
+    
+    # stop_on_error: the failing step ends the script, so step 3 never reports back
+    device = ScriptRunningDevice()
+    setup = ConfigurableContainerSetup(device)
+    ok, results = setup._execute_batched_commands("cid", commands, "Pre-command", stop_on_error=True)
+    print(f"   stop_on_error=True:  ok={ok} results={results}")
+    assert ok is False
+    assert results == {1: 0, 2: 3}
+    assert 'exit "$rc"' in device.scripts[0]
+    assert device.commands[0].startswith("sudo docker exec -i cid sh -c ")
+    
+    # Without stop_on_error every step runs and reports its own exit code
+    device = ScriptRunningDevice()
+    setup = ConfigurableContainerSetup(device)
+    ok, results = setup._execute_batched_commands("cid", commands, "Post-command", stop_on_error=False)
+    print(f"   stop_on_error=False: ok={ok} results={results}")
+    assert ok is False
+    assert results == {1: 0, 2: 3, 3: 0}
+    assert 'exit "$rc"' not in device.scripts[0]
+    
+    # All steps succeeding is the only success
+    ok, results = setup._execute_batched_commands("cid", ["true", "echo done"], "Post-command", stop_on_error=True)
+    print(f"   all succeed:         ok={ok} results={results}")
+    assert ok is True
+    assert results == {1: 0, 2: 0}
+    
+    # A script that never reports a step (e.g. the exec itself failed) is a failure
+    class FailingDevice:
+        def execute_command(self, cmd, timeout=30, input_data=None):
+            return 126, "", "container not running"
+    
+    ok, results = ConfigurableContainerSetup(FailingDevice())._execute_batched_commands(
+        "cid", ["true"], "Pre-command", stop_on_error=True
+    )
+    assert ok is False
+    assert results == {}
+    
+    print("✅ Batched command exit code test PASSED")
+    return True
+
+def test_prepare_runtime_variables():
+    """Test that prepare() fills static variables and leaves per-run ones as placeholders"""
+    print("\n" + "="*80)
+    print("🧪 TESTING SETUP PREPARATION")
+    print("="*80)
+    
+    # Unknown names are left in place rather than replaced
+    assert _render_template_cached("a {{x}} {{y}}", frozenset({'x': 1}.items())) == "a 1 {{y}}"
+    assert _render_template_cached("no placeholders", frozenset()) == "no placeholders"
+    
+    setup = ConfigurableContainerSetup(ScriptRunningDevice())
+    setup.set_template_variables({'session_id': 's1'}, scenario_name="stress")
+    
+    # Capture the unknown-variable warning
+    warnings = []
+    handler = logging.Handler(logging.WARNING)
+    handler.emit = lambda record: warnings.append(record.getMessage())
+    setup.logger.addHandler(handler)
+    try:
+        prepared = setup.prepare(ContainerSetupConfig(
+            pre_commands=("echo {{session_id}} {{container_id}}", "echo {{bogus}}"),
+            file_edits=(FileEdit(file="/tmp/{{scenario_name}}.conf", content="ts={{timestamp}}"),),
+            valgrind_command="valgrind --xml-file=/tmp/{{session_id}}_{{timestamp}}.xml netconfd"
+        ))
+    finally:
+        setup.logger.removeHandler(handler)
+    
+    config = prepared.config
+    print(f"   Pre-commands: {config.pre_commands}")
+    print(f"   Runtime vars: {sorted(prepared.runtime_vars)}")
+    print(f"   Warnings:     {warnings}")
+    assert prepared.runtime_vars == frozenset({'container_id', 'timestamp'})
+    assert config.pre_commands == ("echo s1 {{container_id}}", "echo {{bogus}}")
+    assert config.file_edits[0].file == "/tmp/stress.conf"
+    assert config.file_edits[0].content == "ts={{timestamp}}"
+    assert config.valgrind_command == "valgrind --xml-file=/tmp/s1_{{timestamp}}.xml netconfd"
+    assert len(warnings) == 1 and "bogus" in warnings[0]
+    assert "container_id" not in warnings[0] and "timestamp" not in warnings[0]
+    
+    # Runtime placeholders are filled in per run
+    assert setup._substitute_template(config.pre_commands[0], {'container_id': 'c1'}) == "echo s1 c1"
+    
+    # An explicitly set container_id is static, so it is substituted up front
+    setup.set_template_variables(container_id="fixed")
+    prepared = setup.prepare(ContainerSetupConfig(pre_commands=("echo {{container_id}}",)))
+    assert prepared.runtime_vars == frozenset({'timestamp'})
+    assert prepared.config.pre_commands == ("echo fixed",)
+    
+    print("✅ Setup preparation test PASSED")
+    return True
+
 def demonstrate_workflow():
     """Demonstrate the complete configurable workflow"""
     print("\n" + "="*80)
@@ -271,6 +391,8 @@ def main():
     tests = [
         ("Template Variable Substitution", test_template_substitution),
         ("Configuration Parsing", test_config_parsing),
+        ("Batched Command Exit Codes", test_batched_command_exit_codes),
+        ("Setup Preparation", test_prepare_runtime_variables),
         ("Workflow Demonstration", demonstrate_workflow),
         ("Usage Examples", show_usage_examples)
     ]
@@ -6,6 +6,8 @@ Validates the fixes for killing multiple NETCONF processes and proper Valgrind c
 
 import sys
 import logging
+import shlex
+import subprocess
 from pathlib import Path
 from typing import Dict, List
 
@@ -159,6 +161,240 @@ def test_docker_command_structure():
     
     return True
 
+class CannedDevice:
+    """Mock device connector that returns a fixed result and records the commands it was given"""
+    
+    def __init__(self, stdout="", stderr="", exit_code=0):
+        self.result = (exit_code, stdout, stderr)
+        self.commands = []
+    
+    def execute_command(self, cmd, timeout=30, **kwargs):
+        self.commands.append(cmd)
+        return self.result
+
+def test_container_bundle_parsing():
+    """Test splitting a container bundle into its ===K===/===RC=== sections"""
+    print("\n" + "="*80)
+    print("🧪 TESTING CONTAINER BUNDLE PARSING")
+    print("="*80)
+    
+    stdout = (
+        "===K===inspect===\n/netconf|netconf:1.0|running|2024-01-01T00:00:00Z\n===RC===0\n"
+        "===K===stats===\n===RC===1\n"
+        "===K===ports===\n830/tcp -> 0.0.0.0:830\n===RC===0\n"
+        "===K===logs===\nline 1\nline 2\n===RC===0\n"
+    )
+    device = CannedDevice(stdout=stdout, stderr="stats: permission denied")
+    bundle = DockerManager(device).get_container_bundle("abc123")
+    for key, (rc, output) in bundle.items():
+        print(f"   {key}: rc={rc} output={output!r}")
+    
+    script = device.commands[0]
+    assert "inspect_json" not in script and "json ." not in script
+    assert bundle['inspect'] == (0, "/netconf|netconf:1.0|running|2024-01-01T00:00:00Z\n")
+    # A failed section with no output reports the command's stderr
+    assert bundle['stats'] == (1, "stats: permission denied")
+    assert bundle['ports'] == (0, "830/tcp -> 0.0.0.0:830\n")
+    assert bundle['logs'] == (0, "line 1\nline 2\n")
+    # A section that never reported back counts as failed
+    assert bundle['processes'] == (1, "stats: permission denied")
+    assert 'inspect_json' not in bundle
+    
+    # sections restricts the script to the requested commands
+    device = CannedDevice(stdout='===K===inspect_json===\n{"Name": "/nc"}\n===RC===0\n')
+    bundle = DockerManager(device).get_container_bundle("abc123", sections=('inspect_json',))
+    assert list(bundle) == ['inspect_json']
+    assert bundle['inspect_json'] == (0, '{"Name": "/nc"}\n')
+    assert 'docker port' not in device.commands[0]
+    
+    print("✅ Container bundle parsing test PASSED")
+    return True
+
+class ContainerShellDevice:
+    """Mock device connector that runs 'docker exec <id> sh -c <script>' scripts with the local sh"""
+    
+    def execute_command(self, cmd, timeout=30, **kwargs):
+        script = shlex.split(cmd)[-1]
+        result = subprocess.run(['sh', '-c', script], capture_output=True, text=True, timeout=timeout)
+        return result.returncode, result.stdout, result.stderr
+
+def test_batch_exec_splitting():
+    """Test that _batch_exec returns each command's own exit code and output"""
+    print("\n" + "="*80)
+    print("🧪 TESTING BATCHED EXEC SPLITTING")
+    print("="*80)
+    
+    docker_manager = DockerManager(ContainerShellDevice())
+    results = docker_manager._batch_exec("abc123", [
+        "echo 12 valgrind; echo 13 valgrind",
+        "false",
+        "echo partial; exit 4",
+        "echo never reached",
+    ])
+    for index, (rc, output) in enumerate(results):
+        print(f"   {index}: rc={rc} output={output!r}")
+    
+    assert results[0] == (0, "12 valgrind\n13 valgrind\n")
+    assert results[1] == (1, "")
+    # 'exit' ends the whole script, so its own marker and the next command never report back
+    assert results[2][0] == 1
+    assert results[3][0] == 1
+    
+    # A connector error is reported for every command
+    class BrokenDevice:
+        def execute_command(self, cmd, timeout=30, **kwargs):
+            raise ConnectionError("Not connected to device")
+    
+    results = DockerManager(BrokenDevice())._batch_exec("abc123", ["true", "true"])
+    assert results == [(1, "Error: Not connected to device")] * 2
+    
+    print("✅ Batched exec splitting test PASSED")
+    return True
+
+def test_system_info_parsing():
+    """Test get_system_info's marker parsing and its per-connection cache of static fields"""
+    print("\n" + "="*80)
+    print("🧪 TESTING SYSTEM INFO PARSING")
+    print("="*80)
+    
+    device = DeviceConnector(DeviceConfig(hostname="test", username="test"))
+    scripts = []
+    outputs = [
+        "===K===hostname===\nrouter1\n===RC===0\n"
+        "===K===uptime===\n 10:00:00 up 5 days\n===RC===0\n"
+        "===K===memory===\nMem: 8G\n===RC===0\n"
+        "===K===disk===\n/dev/sda1 50%\n===RC===0\n"
+        "===K===os_version===\nNAME=\"Linux\"\n===RC===0\n"
+        "===K===kernel===\n===RC===127\n",
+        "===K===uptime===\n 10:05:00 up 5 days\n===RC===0\n"
+        "===K===memory===\nMem: 8G\n===RC===0\n"
+        "===K===disk===\n/dev/sda1 51%\n===RC===0\n"
+        "===K===kernel===\nLinux 6.1\n===RC===0\n",
+    ]
+    
+    def execute_command(script, timeout=30):
+        scripts.append(script)
+        return 0, outputs[len(scripts) - 1], "uname: not found"
+    
+    device.execute_command = execute_command
+    
+    info = device.get_system_info()
+    for key, value in info.items():
+        print(f"   {key}: {value!r}")
+    assert info['hostname'] == "router1"
+    assert info['uptime'] == "10:00:00 up 5 days"
+    assert info['os_version'] == 'NAME="Linux"'
+    assert info['kernel'] == "Command failed: uname: not found"
+    
+    # hostname and os_version are not queried again; the failed kernel probe is retried
+    info = device.get_system_info()
+    assert "hostname" not in scripts[1] and "os-release" not in scripts[1]
+    assert "uname -a" in scripts[1]
+    assert info['hostname'] == "router1"
+    assert info['disk'] == "/dev/sda1 51%"
+    assert info['kernel'] == "Linux 6.1"
+    assert list(info) == ['hostname', 'uptime', 'memory', 'disk', 'os_version', 'kernel']
+    
+    print("✅ System info parsing test PASSED")
+    return True
+
+def test_proc_process_parsing():
+    """Test parsing the /proc stat/statm records streamed by _find_netconf_processes"""
+    print("\n" + "="*80)
+    print("🧪 TESTING /PROC PROCESS PARSING")
+    print("="*80)
+    
+    def stat_line(pid, comm, utime, stime, starttime):
+        # Fields after '(comm)': state, then 10 more before utime/stime, and 6 more before starttime
+        return (f"{pid} ({comm}) S 1 {pid} {pid} 0 -1 4194560 100 0 0 0 {utime} {stime} "
+                f"0 0 20 0 1 0 {starttime} 12345678 2560")
+    
+    # Header is 'CLK_TCK PAGESIZE uptime'; each record is '==P <pid>', stat, statm and cmdline
+    lines = [
+        "100 4096 1000.00",
+        "==P 42", stat_line(42, "netconfd", 500, 300, 50000), "3000 2560 100 1 0 200 0",
+        "/usr/bin/netconfd\0--foreground\0",
+        # A comm with spaces and parentheses must not shift the stat fields
+        "==P 43", stat_line(43, "conf (d) x", 0, 100, 90000), "1000 256 10 1 0 50 0",
+        "valgrind\0--tool=memcheck\0/usr/sbin/confd\0",
+        # The in-container grep is case-insensitive, but the name must still match a pattern
+        "==P 44", stat_line(44, "bash", 0, 0, 0), "100 10 1 1 0 5 0", "bash\0",
+        # Truncated record: the process exited between the stat and statm reads
+        "==P 45", stat_line(45, "sysrepod", 0, 0, 0), "", "sysrepod\0",
+    ]
+    
+    class LinesDevice:
+        def __init__(self, lines):
+            self.lines = lines
+        
+        def execute_command_lines(self, cmd, timeout=30):
+            return iter(self.lines)
+    
+    processes = DockerManager(LinesDevice(lines))._find_netconf_processes("abc123")
+    for proc in processes:
+        print(f"   PID {proc.pid}: {proc.name} rss={proc.memory_usage}KB cpu={proc.cpu_usage}% - {proc.command}")
+    
+    assert [proc.pid for proc in processes] == [42, 43]
+    netconfd, confd = processes
+    assert netconfd.name == "netconfd"
+    assert netconfd.command == "/usr/bin/netconfd --foreground"
+    # 2560 pages of 4 KiB; 8 s of CPU over 500 s since start
+    assert netconfd.memory_usage == 10240
+    assert netconfd.cpu_usage == 1.6
+    assert confd.name == "confd"
+    assert confd.memory_usage == 1024
+    # 1 s of CPU over 100 s since start
+    assert confd.cpu_usage == 1.0
+    
+    # No header means the script failed in the container
+    assert DockerManager(LinesDevice([]))._find_netconf_processes("abc123") == []
+    
+    print("✅ /proc process parsing test PASSED")
+    return True
+
+def test_cgroup_memory_parsing():
+    """Test _read_cgroup_memory for cgroup v2 and v1 readings"""
+    print("\n" + "="*80)
+    print("🧪 TESTING CGROUP MEMORY PARSING")
+    print("="*80)
+    
+    def read(stdout, exit_code=0):
+        return DockerManager(CannedDevice(stdout=stdout, exit_code=exit_code))._read_cgroup_memory("abc123")
+    
+    MiB = 1024 * 1024
+    
+    # 'usage inactive_file limit cpu1 cpu2 ns_per_unit'; v2 reports CPU in usec and 'max' for no limit
+    v2_unlimited = read(f"{100 * MiB} {4 * MiB} max 1000000 1050000 1000\n")
+    print(f"   v2 unlimited: {v2_unlimited}")
+    assert v2_unlimited == {'usage': "96MiB / unlimited", 'limit': 'unlimited',
+                            'memory_percent': 'unknown', 'cpu': "50.00%"}
+    
+    v2_limited = read(f"{50 * MiB} {10 * MiB} {100 * MiB} 0 10000 1000\n")
+    print(f"   v2 limited:   {v2_limited}")
+    assert v2_limited == {'usage': "40MiB / 100MiB", 'limit': "100MiB",
+                          'memory_percent': "40.00%", 'cpu': "10.00%"}
+    
+    # v1 reports CPU in ns and "no limit" as a huge page-aligned number
+    v1_unlimited = read(f"{200 * MiB} 0 9223372036854771712 100000000 150000000 1\n")
+    print(f"   v1 unlimited: {v1_unlimited}")
+    assert v1_unlimited['usage'] == "200MiB / unlimited"
+    assert v1_unlimited['limit'] == 'unlimited'
+    assert v1_unlimited['cpu'] == "50.00%"
+    
+    v1_limited = read(f"{2048 * MiB} {1024 * MiB} {4096 * MiB} 0 0 1\n")
+    assert v1_limited['usage'] == "1GiB / 4GiB"
+    assert v1_limited['memory_percent'] == "25.00%"
+    
+    # Inactive cache larger than usage never gives a negative figure
+    assert read(f"{MiB} {2 * MiB} max 0 0 1000\n")['usage'] == "0B / unlimited"
+    
+    # Missing fields (e.g. no inactive_file line) or a failed exec fall back to docker stats
+    assert read(f"{100 * MiB} max 0 0 1000\n") is None
+    assert read("", exit_code=2) is None
+    
+    print("✅ cgroup memory parsing test PASSED")
+    return True
+
 def simulate_valgrind_command():
     """Simulate and validate Valgrind command construction"""
     print("\n" + "="*80)
@@ -239,6 +475,25 @@ def main():
         print(f"❌ Test 2: Valgrind command construction - ERROR: {e}")
         all_tests_passed = False
     
+    # Offline parsing tests against mocked device connectors
+    offline_tests = [
+        ("Container bundle parsing", test_container_bundle_parsing),
+        ("Batched exec splitting", test_batch_exec_splitting),
+        ("System info parsing", test_system_info_parsing),
+        ("/proc process parsing", test_proc_process_parsing),
+        ("cgroup memory parsing", test_cgroup_memory_parsing),
+    ]
+    for test_name, test_func in offline_tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - PASSED")
+            else:
+                print(f"❌ {test_name} - FAILED")
+                all_tests_passed = False
+        except Exception as e:
+            print(f"❌ {test_name} - ERROR: {e}")
+            all_tests_passed = False
+    
     # Test 3: Live NETCONF process management (requires actual device)
     print("\n" + "="*50)
     print("⚠️  LIVE DEVICE TEST")
@@ -86,7 +86,7 @@ def mock_docker_manager(mock_device_connector):
             memory_limit='2GB',
             memory_usage='1GB',
             cpu_usage='10%',
-            ports=['8080:8080'],
+            ports=('8080:8080',),
             created='2025-01-01'
         )
     ]